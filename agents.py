@@ -3,11 +3,92 @@ Translation agents implementation.
 Each agent is a specialized translator using Claude API.
 """
 import json
-from typing import Dict, Optional
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
 from pathlib import Path
 from anthropic import Anthropic
 
 import config
+from utils import dedup_index
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> Anthropic:
+    """
+    Get the process-wide Anthropic client.
+
+    The client holds the HTTP connection pool, so every agent and the
+    orchestrator share one instance instead of building their own.
+
+    Returns:
+        Shared Anthropic client
+    """
+    global _client
+    if not config.ANTHROPIC_API_KEY:
+        raise ValueError(config.MISSING_API_KEY_MESSAGE)
+
+    with _client_lock:
+        if _client is None:
+            _client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
+    return _client
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in a text without an API call.
+
+    Uses UTF-8 byte length as a proxy, which tracks tokenizer behaviour
+    across scripts: ~4 bytes/token for Latin text, ~2 chars/token for Hebrew.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Estimated token count (at least 1)
+    """
+    return max(1, len(text.encode('utf-8')) // config.BYTES_PER_TOKEN)
+
+
+def summarize_calls(calls: List[Dict], sentences: Optional[int] = None) -> Dict:
+    """
+    Summarize per-call latency and output token usage.
+
+    Args:
+        calls: List of {"latency_s", "output_tokens"} records; truncation
+            retries are flagged with "retry"
+        sentences: Number of sentences the calls served (default: one per call)
+
+    Returns:
+        Dictionary with totals, per-sentence means, p95 latency and the
+        share of calls retried after a truncated response
+    """
+    if not calls:
+        return {"calls": 0}
+    sentences = sentences or len(calls)
+
+    latencies = sorted(c["latency_s"] for c in calls)
+    output_tokens = [c["output_tokens"] for c in calls]
+    p95_index = min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))
+    retries = sum(1 for c in calls if c.get("retry"))
+    first_attempts = sum(1 for c in calls if not c.get("retry") and not c.get("hedge_loser"))
+
+    return {
+        "calls": len(calls),
+        "output_tokens_total": sum(output_tokens),
+        "output_tokens_per_sentence": sum(output_tokens) / sentences,
+        "latency_total_s": sum(latencies),
+        "latency_mean_s": sum(latencies) / len(latencies),
+        "latency_p95_s": latencies[p95_index],
+        "truncation_retries": retries,
+        "retry_rate": retries / first_attempts if first_attempts else 0.0
+    }
 
 
 class TranslationAgent:
@@ -18,7 +99,12 @@ class TranslationAgent:
         agent_id: str,
         prompt_file: Path,
         source_lang: str,
-        target_lang: str
+        target_lang: str,
+        lean_responses: bool = config.LEAN_RESPONSES,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        routing: bool = config.ROUTING_ENABLED,
+        hedging: bool = config.HEDGING_ENABLED
     ):
         """
         Initialize translation agent.
@@ -28,21 +114,70 @@ class TranslationAgent:
             prompt_file: Path to the agent's system prompt
             source_lang: Source language code
             target_lang: Target language code
+            lean_responses: Request only translation and confidence, with
+                max_tokens sized from the source sentence
+            model: Model name (default: config.MODEL_NAME)
+            temperature: Sampling temperature (default: config.TEMPERATURE)
+            routing: Translate with the fast model tier first and escalate
+                only low-confidence or failed sentences to stronger tiers
+            hedging: Fire a duplicate request when a call runs longer than
+                the learned latency percentile; the first answer wins
         """
         self.agent_id = agent_id
         self.source_lang = source_lang
         self.target_lang = target_lang
-        self.client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
+        self.lean_responses = lean_responses
+        self.model = model or config.MODEL_NAME
+        self.temperature = config.TEMPERATURE if temperature is None else temperature
+        self.client = get_client()
+
+        # Model tiers for confidence-driven routing (last tier is the strongest)
+        routing_config = config.AGENT_ROUTING.get(agent_id, {})
+        self.routing = routing
+        self.model_tiers = list(dict.fromkeys(
+            routing_config.get("models", [config.FAST_MODEL_NAME, self.model])
+        ))
+        self.escalation_threshold = routing_config.get(
+            "threshold", config.ESCALATION_THRESHOLD
+        )
+
+        # Hedged requests: recent latencies per model and per-batch counters
+        self.hedging = hedging
+        self.recent_latencies = {}
+        self.hedge_budget = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self._hedge_lock = threading.Lock()
+        self._hedge_executor = None
 
-        # Load system prompt
+        # Unique sentences of a batch translated at once (1 = sequential)
+        self.max_concurrency = 1
+
+        # Time FirstHopPrefetcher spent on the precomputed part of a batch
+        self.prefetch_wall_time_s = 0.0
+
+        # Per-call latency/token records and summary of the last batch
+        self.call_log = []
+        self.last_results = []
+        self.last_batch_stats = {}
+
+        # Load system prompt (generic prompts carry language placeholders)
         with open(prompt_file, 'r', encoding='utf-8') as f:
-            self.system_prompt = f.read()
+            self.system_prompt = (
+                f.read()
+                .replace("{AGENT_ID}", agent_id)
+                .replace("{SOURCE_LANGUAGE}", config.LANGUAGE_NAMES.get(source_lang, source_lang))
+                .replace("{TARGET_LANGUAGE}", config.LANGUAGE_NAMES.get(target_lang, target_lang))
+                .replace("{SOURCE_CODE}", source_lang)
+                .replace("{TARGET_CODE}", target_lang)
+            )
 
     def translate(
         self,
         sentence_id: int,
         text: str,
-        timestamp: Optional[str] = None
+        timestamp: Optional[str] = None,
+        model: Optional[str] = None
     ) -> Dict:
         """
         Translate a sentence.
@@ -51,6 +186,7 @@ class TranslationAgent:
             sentence_id: Unique sentence identifier
             text: Text to translate
             timestamp: Optional timestamp
+            model: Model override (default: the agent's model)
 
         Returns:
             Dictionary with translation result
@@ -59,6 +195,7 @@ class TranslationAgent:
 
         if timestamp is None:
             timestamp = datetime.now().isoformat()
+        model = model or self.model
 
         # Prepare request
         request = {
@@ -70,23 +207,48 @@ class TranslationAgent:
         }
 
         # Create user message
+        if self.lean_responses:
+            response_instruction = (
+                'Respond with ONLY a compact JSON object of the form '
+                '{"translation": "...", "confidence": 0.0}. '
+                'Omit sentence_id, agent_id and notes. '
+                'Do not include any other text or explanation.'
+            )
+        else:
+            response_instruction = (
+                'Respond with ONLY a valid JSON object in the format specified '
+                'in your system prompt. Do not include any other text or explanation.'
+            )
+
         user_message = f"""Please translate the following sentence:
 
 {json.dumps(request, ensure_ascii=False, indent=2)}
 
-Respond with ONLY a valid JSON object in the format specified in your system prompt. Do not include any other text or explanation."""
+{response_instruction}"""
 
         # Call Claude API
         try:
-            response = self.client.messages.create(
-                model=config.MODEL_NAME,
-                max_tokens=config.MAX_TOKENS,
-                temperature=config.TEMPERATURE,
-                system=self.system_prompt,
-                messages=[
-                    {"role": "user", "content": user_message}
-                ]
-            )
+            max_tokens = self.response_token_limit(text)
+            retry = False
+            while True:
+                start = time.perf_counter()
+                response = self.create_message(model, max_tokens, user_message)
+                call = {
+                    "model": model,
+                    "latency_s": time.perf_counter() - start,
+                    "output_tokens": response.usage.output_tokens
+                }
+                if retry:
+                    call["retry"] = True
+                self.call_log.append(call)
+                # A proportional cap can cut off scripts that need more tokens
+                # per character (e.g. Hebrew, Arabic, Russian); retry once uncapped
+                if response.stop_reason != "max_tokens" or max_tokens >= config.MAX_TOKENS:
+                    break
+                max_tokens = config.MAX_TOKENS
+                retry = True
+            if response.stop_reason == "max_tokens":
+                raise ValueError(f"Response truncated at {max_tokens} tokens")
 
             # Extract response text
             response_text = response.content[0].text.strip()
@@ -110,6 +272,11 @@ Respond with ONLY a valid JSON object in the format specified in your system pro
                 response_text = '\n'.join(json_lines)
 
             result = json.loads(response_text)
+
+            # Lean responses omit the bookkeeping fields; fill them locally
+            result.setdefault("sentence_id", sentence_id)
+            result.setdefault("agent_id", self.agent_id)
+            result.setdefault("notes", "")
             return result
 
         except Exception as e:
@@ -122,65 +289,462 @@ Respond with ONLY a valid JSON object in the format specified in your system pro
                 "notes": f"ERROR: {str(e)}"
             }
 
-    def batch_translate(self, sentences: list[str]) -> list[str]:
+    def create_message(self, model: str, max_tokens: int, user_message: str):
+        """
+        Call the Messages API, hedging slow calls when enabled.
+
+        Once enough latencies have been observed for the model, a call still
+        running after the HEDGE_PERCENTILE latency gets a duplicate request
+        (while the batch's hedge budget lasts). The first successful response
+        wins. A started request can't be cancelled, so the loser is left to
+        finish and is then added to call_log (flagged 'hedge_loser'). The
+        latency window always gets the primary request's own latency, so
+        hedge wins don't drag the percentile down.
+
+        Args:
+            model: Model name
+            max_tokens: Response token cap
+            user_message: User message content
+
+        Returns:
+            API response
+        """
+        def call():
+            return self.client.messages.create(
+                model=model,
+                max_tokens=max_tokens,
+                temperature=self.temperature,
+                system=self.system_prompt,
+                messages=[
+                    {"role": "user", "content": user_message}
+                ]
+            )
+
+        start = time.perf_counter()
+        delay = self.hedge_delay(model)
+        if delay is None:
+            response = call()
+            self.record_latency(model, time.perf_counter() - start)
+            return response
+
+        def record_primary(future):
+            if future.exception() is None:
+                self.record_latency(model, time.perf_counter() - start)
+
+        executor = self.hedge_executor()
+        primary = executor.submit(call)
+        primary.add_done_callback(record_primary)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self.take_hedge():
+            return primary.result()
+
+        hedge_start = time.perf_counter()
+        hedge = executor.submit(call)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._hedge_lock:
+                            self.hedges_won += 1
+                    for loser in pending:
+                        loser_start = start if loser is primary else hedge_start
+                        loser.add_done_callback(
+                            lambda f, loser_start=loser_start: self.log_hedge_loser(
+                                f, model, loser_start
+                            )
+                        )
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def hedge_executor(self) -> ThreadPoolExecutor:
+        """Create the thread pool for primary and hedge requests once (thread-safe)."""
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                # Each concurrent slot may hold a primary, a hedge and a loser
+                # still finishing from its previous call
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=max(config.HEDGE_MAX_WORKERS, 3 * self.max_concurrency),
+                    thread_name_prefix=f"{self.agent_id}-hedge"
+                )
+            return self._hedge_executor
+
+    def log_hedge_loser(self, future, model: str, start: float) -> None:
+        """Add the losing request of a hedge to call_log once it finishes."""
+        if future.exception() is not None:
+            return
+        self.call_log.append({
+            "model": model,
+            "latency_s": time.perf_counter() - start,
+            "output_tokens": future.result().usage.output_tokens,
+            "hedge_loser": True
+        })
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Latency percentile after which a call is hedged, or None if hedging is off or still learning."""
+        if not self.hedging:
+            return None
+        with self._hedge_lock:
+            latencies = sorted(self.recent_latencies.get(model, ()))
+        if len(latencies) < config.HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(latencies) - 1, int(config.HEDGE_PERCENTILE / 100 * len(latencies)))
+        return latencies[index]
+
+    def take_hedge(self) -> bool:
+        """Consume one hedge from the batch budget; False when it is spent."""
+        with self._hedge_lock:
+            if self.hedges_fired >= self.hedge_budget:
+                return False
+            self.hedges_fired += 1
+            return True
+
+    def record_latency(self, model: str, latency: float) -> None:
+        """Add an observed call latency to the model's sliding window."""
+        with self._hedge_lock:
+            self.recent_latencies.setdefault(
+                model, deque(maxlen=config.HEDGE_WINDOW)
+            ).append(latency)
+
+    def response_token_limit(self, text: str) -> int:
+        """
+        Compute the max_tokens cap for translating a sentence.
+
+        Lean responses are capped proportionally to the source length, with
+        extra headroom for target languages in non-Latin scripts
+        (TARGET_TOKEN_HEADROOM), so a runaway generation cannot dominate
+        latency; translate() retries a
+        truncated response once with the global limit. Full responses keep
+        the global limit because the free-form notes field is unbounded.
+
+        Args:
+            text: Source text
+
+        Returns:
+            max_tokens value for the API call
+        """
+        if not self.lean_responses:
+            return config.MAX_TOKENS
+
+        headroom = config.TARGET_TOKEN_HEADROOM.get(self.target_lang, 1.0)
+        limit = config.RESPONSE_TOKEN_OVERHEAD + math.ceil(
+            config.RESPONSE_TOKENS_PER_SOURCE_TOKEN * headroom * estimate_tokens(text)
+        )
+        return min(config.MAX_TOKENS, max(config.MIN_RESPONSE_TOKENS, limit))
+
+    def max_calls(self, num_sentences: int) -> int:
+        """
+        Upper bound of API requests batch_translate can make for a batch.
+
+        Every sentence may run on every routing tier, each lean call may be
+        retried once after truncation, and hedges add at most hedge_budget
+        duplicate requests.
+
+        Args:
+            num_sentences: Sentences in the batch
+
+        Returns:
+            Worst-case number of API requests
+        """
+        tiers = len(self.model_tiers) if self.routing else 1
+        attempts = 2 if self.lean_responses else 1
+        hedges = math.ceil(config.HEDGE_MAX_FRACTION * num_sentences) if self.hedging else 0
+        return num_sentences * tiers * attempts + hedges
+
+    def needs_escalation(self, result: Dict) -> bool:
+        """Whether a result is failed or below the agent's confidence threshold."""
+        return (
+            not result.get("translation")
+            or result.get("confidence", 0.0) < self.escalation_threshold
+        )
+
+    @staticmethod
+    def better_result(previous: Optional[Dict], candidate: Dict) -> Dict:
+        """
+        Pick between a sentence's earlier result and a stronger tier's retry.
+
+        The retry replaces the earlier result only if it has a translation
+        and higher confidence, so a failed or less confident escalation keeps
+        the usable result from the tier before.
+
+        Args:
+            previous: Result of the earlier tier (None on the first tier)
+            candidate: Result of the current tier
+
+        Returns:
+            The result to keep
+        """
+        if previous is None or not previous.get("translation"):
+            return candidate
+        if candidate.get("translation") and \
+                candidate.get("confidence", 0.0) > previous.get("confidence", 0.0):
+            return candidate
+        return previous
+
+    def batch_translate(
+        self,
+        sentences: list[str],
+        precomputed: Optional[List[Dict]] = None
+    ) -> list[str]:
         """
         Translate a batch of sentences.
 
+        With routing enabled, every sentence is first translated on the
+        fastest model tier and only failed or low-confidence results are
+        re-run on the next tier, up to the agent's own model; a re-run only
+        replaces the earlier result when it is non-empty and more confident
+        (see better_result). Byte-identical duplicate sentences are
+        translated once and the result is copied to every occurrence. Up to
+        max_concurrency unique sentences are translated at once.
+
         Args:
             sentences: List of sentences to translate
+            precomputed: translate() results already obtained on the first
+                tier (e.g. while sentences were streamed in); their calls
+                are expected in call_log, their hedges in the hedge
+                counters and their wall time in prefetch_wall_time_s
 
         Returns:
             List of translated sentences
         """
-        translations = []
         from tqdm import tqdm
 
-        print(f"\n{self.agent_id} processing {len(sentences)} sentences...")
+        streamed = f" ({len(precomputed)} translated while streaming)" if precomputed else ""
+        print(f"\n{self.agent_id} processing {len(sentences)} sentences{streamed}...")
+
+        if precomputed is None:
+            self.call_log = []
+        start = time.perf_counter()
+
+        # Only the first occurrence of each unique sentence is translated
+        first_rows, owners = dedup_index(sentences)
+        if len(first_rows) < len(sentences):
+            print(f"  {len(sentences) - len(first_rows)} duplicate sentences reuse earlier translations")
+
+        # Cap duplicate requests at a fraction of this batch's sentences,
+        # keeping the hedges already fired on precomputed results
+        with self._hedge_lock:
+            self.hedge_budget = math.ceil(config.HEDGE_MAX_FRACTION * len(first_rows))
+            if precomputed is None:
+                self.hedges_fired = 0
+                self.hedges_won = 0
+
+        tiers = self.model_tiers if self.routing else [self.model]
+        results = [None] * len(sentences)
+        pending = first_rows
+        escalations = []
+
+        for tier, model in enumerate(tiers):
+            todo = pending
+            if tier == 0 and precomputed:
+                results[:len(precomputed)] = precomputed
+                todo = [i for i in pending if i >= len(precomputed)]
+            desc = self.agent_id if len(tiers) == 1 else f"{self.agent_id} [{model}]"
+            if self.max_concurrency > 1 and len(todo) > 1:
+                with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(todo))) as executor:
+                    translated = executor.map(
+                        lambda i: self.translate(sentence_id=i+1, text=sentences[i], model=model),
+                        todo
+                    )
+                    for i, result in zip(todo, tqdm(translated, desc=desc, total=len(todo))):
+                        results[i] = self.better_result(results[i], result)
+            else:
+                for i in tqdm(todo, desc=desc):
+                    results[i] = self.better_result(
+                        results[i],
+                        self.translate(sentence_id=i+1, text=sentences[i], model=model)
+                    )
+
+            if tier < len(tiers) - 1:
+                pending = [i for i in pending if self.needs_escalation(results[i])]
+                escalations.append(len(pending))
+                if not pending:
+                    break
+
+        # Fan results out to duplicates, keeping each row's own sentence_id
+        for i, owner in enumerate(owners):
+            if first_rows[owner] != i:
+                results[i] = {**results[first_rows[owner]], "sentence_id": i + 1}
 
-        for i, sentence in enumerate(tqdm(sentences, desc=f"{self.agent_id}")):
-            result = self.translate(sentence_id=i+1, text=sentence)
-            translation = result.get("translation", "")
-            translations.append(translation)
+        translations = []
+        for i, result in enumerate(results):
+            translations.append(result.get("translation", ""))
 
             # Log low confidence translations
             confidence = result.get("confidence", 0.0)
             if confidence < 0.7:
                 print(f"  ⚠ Low confidence ({confidence:.2f}) on sentence {i+1}")
 
+        self.last_results = results
+        self.last_batch_stats = {
+            "agent_id": self.agent_id,
+            "response_mode": "lean" if self.lean_responses else "full",
+            "sentences": len(sentences),
+            "unique_sentences": len(first_rows),
+            "wall_time_s": time.perf_counter() - start + (
+                self.prefetch_wall_time_s if precomputed is not None else 0.0
+            ),
+            **summarize_calls(self.call_log, len(sentences))
+        }
+        if precomputed is not None:
+            self.last_batch_stats["prefetch_wall_time_s"] = self.prefetch_wall_time_s
+        if self.routing:
+            self.last_batch_stats["routing"] = self.summarize_routing(
+                tiers, escalations, len(first_rows), self.last_batch_stats["wall_time_s"]
+            )
+        if self.hedging:
+            self.last_batch_stats["hedging"] = {
+                "fired": self.hedges_fired,
+                "won": self.hedges_won,
+                "budget": self.hedge_budget,
+                "percentile": config.HEDGE_PERCENTILE,
+                "delay_s": {model: self.hedge_delay(model) for model in tiers}
+            }
+
         return translations
 
+    def summarize_routing(
+        self,
+        tiers: List[str],
+        escalations: List[int],
+        num_sentences: int,
+        wall_time: float
+    ) -> Dict:
+        """
+        Summarize escalations and the latency gain of tiered routing.
+
+        The gain compares the summed call latency against running every
+        sentence on the strongest tier. That baseline uses the tier's latency
+        from config.ROUTING_BASELINE_LATENCY_S, else the mean of its recent
+        latencies, which include earlier batches and non-escalated calls
+        (unavailable until the tier has been called at all).
+
+        Args:
+            tiers: Model tiers used, fastest first
+            escalations: Sentences escalated past each tier
+            num_sentences: Sentences in the batch
+            wall_time: Wall time of the batch in seconds
+
+        Returns:
+            Dictionary with per-tier call stats, escalation counts and gain
+        """
+        per_tier = {
+            model: summarize_calls([c for c in self.call_log if c["model"] == model])
+            for model in tiers
+        }
+        actual_latency = sum(c["latency_s"] for c in self.call_log)
+
+        strong_latency = config.ROUTING_BASELINE_LATENCY_S.get(tiers[-1])
+        if strong_latency is None:
+            with self._hedge_lock:
+                recent = list(self.recent_latencies.get(tiers[-1], ()))
+            strong_latency = sum(recent) / len(recent) if recent else None
+        baseline_latency = (
+            strong_latency * num_sentences if strong_latency is not None else None
+        )
+        escalated = escalations[0] if escalations else 0
+
+        return {
+            "tiers": tiers,
+            "threshold": self.escalation_threshold,
+            "escalated": escalated,
+            "escalation_rate": escalated / num_sentences if num_sentences else 0.0,
+            "escalated_per_tier": escalations,
+            "per_tier": per_tier,
+            "latency_total_s": actual_latency,
+            "strong_latency_per_sentence_s": strong_latency,
+            "strong_only_latency_estimate_s": baseline_latency,
+            "latency_gain": (
+                baseline_latency / actual_latency
+                if baseline_latency and actual_latency else None
+            ),
+            "throughput_sentences_per_s": (
+                num_sentences / wall_time if wall_time else None
+            )
+        }
+
 
 class Agent1HebrewToEnglish(TranslationAgent):
     """Agent 1: Hebrew to English translator."""
 
-    def __init__(self):
+    def __init__(self, **kwargs):
         super().__init__(
             agent_id="agent1_hebrew_to_english",
             prompt_file=config.AGENT1_PROMPT_FILE,
             source_lang="he",
-            target_lang="en"
+            target_lang="en",
+            **kwargs
         )
 
 
 class Agent2EnglishToFrench(TranslationAgent):
     """Agent 2: English to French translator."""
 
-    def __init__(self):
+    def __init__(self, **kwargs):
         super().__init__(
             agent_id="agent2_english_to_french",
             prompt_file=config.AGENT2_PROMPT_FILE,
             source_lang="en",
-            target_lang="fr"
+            target_lang="fr",
+            **kwargs
         )
 
 
 class Agent3FrenchToHebrew(TranslationAgent):
     """Agent 3: French to Hebrew translator."""
 
-    def __init__(self):
+    def __init__(self, **kwargs):
         super().__init__(
             agent_id="agent3_french_to_hebrew",
             prompt_file=config.AGENT3_PROMPT_FILE,
             source_lang="fr",
-            target_lang="he"
+            target_lang="he",
+            **kwargs
         )
+
+
+# Dedicated agents with hand-written prompts, keyed by (source, target)
+AGENT_CLASSES = {
+    ("he", "en"): Agent1HebrewToEnglish,
+    ("en", "fr"): Agent2EnglishToFrench,
+    ("fr", "he"): Agent3FrenchToHebrew
+}
+
+
+def create_agent(source_lang: str, target_lang: str, **kwargs) -> TranslationAgent:
+    """
+    Create a translation agent for a language hop.
+
+    Uses the dedicated agent when one exists, otherwise a generic agent
+    driven by the templated generic prompt.
+
+    Args:
+        source_lang: Source language code
+        target_lang: Target language code
+        **kwargs: Extra TranslationAgent options
+
+    Returns:
+        Translation agent for the hop
+    """
+    if (source_lang, target_lang) in AGENT_CLASSES:
+        return AGENT_CLASSES[(source_lang, target_lang)](**kwargs)
+
+    for code in (source_lang, target_lang):
+        if code not in config.LANGUAGE_NAMES:
+            raise ValueError(
+                f"Unknown language code '{code}'. "
+                f"Supported: {', '.join(sorted(config.LANGUAGE_NAMES))}"
+            )
+
+    source_name = config.LANGUAGE_NAMES[source_lang].lower()
+    target_name = config.LANGUAGE_NAMES[target_lang].lower()
+    return TranslationAgent(
+        agent_id=f"agent_{source_name}_to_{target_name}",
+        prompt_file=config.GENERIC_AGENT_PROMPT_FILE,
+        source_lang=source_lang,
+        target_lang=target_lang,
+        **kwargs
+    )
@@ -0,0 +1,247 @@
+"""
+Offline, incremental round-trip quality analysis.
+
+Re-scores an existing run directory without calling the API. Distances and
+surface metric statistics (chrF, BLEU, edit distance) are cached per
+(original, final) sentence pair, so after editing a few sentences or
+re-running a prompt tweak only the changed pairs are re-embedded and
+re-counted, and an unchanged run does no scoring work at all.
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import config
+from metrics import MetricEngine, summarize_metrics
+from pipeline import chain_key, chain_title, quality_output_files, stage_output_file
+from utils import EmbeddingEngine, FileManager, StatsCalculator, Visualizer
+
+
+def pair_key(original: str, final: str) -> str:
+    """Stable cache key of an (original, final) sentence pair."""
+    digest = hashlib.sha256(f"{original}\0{final}".encode(config.FILE_ENCODING))
+    return digest.hexdigest()[:32]
+
+
+def analysis_cache_file(chain: Sequence[str], output_dir: Optional[Path] = None) -> Path:
+    """
+    Get the distance cache file of a round-trip chain.
+
+    Args:
+        chain: Round-trip language chain
+        output_dir: Run directory (default: config.OUTPUT_DIR)
+
+    Returns:
+        Path of the cache file
+    """
+    cache_file = config.ANALYSIS_CACHE_FILE
+    name = cache_file.name if tuple(chain) == config.DEFAULT_CHAIN else (
+        f"{cache_file.stem}_{chain_key(chain)}{cache_file.suffix}"
+    )
+    return (output_dir or config.OUTPUT_DIR) / name
+
+
+def _read_cache(filepath: Path) -> Dict:
+    """Read a cache file (empty if missing or unreadable)."""
+    try:
+        with open(filepath, 'r', encoding=config.FILE_ENCODING) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_analysis_cache(filepath: Path) -> Dict[str, float]:
+    """Load a pair-key -> distance cache (empty if missing or unreadable)."""
+    return _read_cache(filepath).get("distances", {})
+
+
+def load_metric_cache(filepath: Path) -> Dict[str, Dict[str, List[float]]]:
+    """Load metric name -> pair-key -> statistics row (empty if missing)."""
+    return _read_cache(filepath).get("metric_statistics", {})
+
+
+def save_analysis_cache(
+    filepath: Path,
+    originals: List[str],
+    finals: List[str],
+    distances: List[float],
+    statistics: Optional[Dict[str, np.ndarray]] = None
+) -> None:
+    """
+    Save the distances (and metric statistics) of the current sentence pairs
+    as the new cache.
+
+    Args:
+        filepath: Cache file
+        originals: Original sentences
+        finals: Final sentences
+        distances: Distance of each pair
+        statistics: Optional metric name -> per-pair statistics rows
+            (see MetricJob.statistics)
+    """
+    keys = [pair_key(original, final) for original, final in zip(originals, finals)]
+    cache = {"distances": dict(zip(keys, distances))}
+    if statistics:
+        cache["metric_statistics"] = {
+            name: dict(zip(keys, rows.tolist())) for name, rows in statistics.items()
+        }
+    with open(filepath, 'w', encoding=config.FILE_ENCODING) as f:
+        json.dump(cache, f)
+
+
+class IncrementalAnalyzer:
+    """Re-scores a run directory, embedding only sentence pairs that changed."""
+
+    def __init__(
+        self,
+        run_dir: Path = config.OUTPUT_DIR,
+        chain: Sequence[str] = config.DEFAULT_CHAIN,
+        embedding_engine: Optional[EmbeddingEngine] = None,
+        metric_engine: Optional[MetricEngine] = None
+    ):
+        """
+        Args:
+            run_dir: Directory of a previous run
+            chain: Round-trip chain to analyze
+            embedding_engine: Already-loaded embedding engine (loaded lazily otherwise)
+            metric_engine: Metric engine (and process pool) to reuse (created
+                lazily otherwise; the caller closes it)
+        """
+        self.run_dir = Path(run_dir)
+        self.chain = tuple(chain)
+        self.embedding_engine = embedding_engine
+        self.metric_engine = metric_engine
+        self.stats_calculator = StatsCalculator()
+        self.file_manager = FileManager()
+        self.visualizer = Visualizer()
+
+    def load(self, source: str = "auto") -> Tuple[List[str], List[str]]:
+        """
+        Load original and final sentences of the chain.
+
+        Args:
+            source: 'text' (numbered text files), 'artifact' (run.arrow) or
+                'auto' (text files if present, else the artifact)
+
+        Returns:
+            Tuple of (originals, finals)
+        """
+        original_file = stage_output_file(self.chain[:1], self.run_dir)
+        final_file = stage_output_file(self.chain, self.run_dir)
+        artifact_file = self.run_dir / config.RUN_ARTIFACT_FILE.name
+
+        if source == "auto":
+            source = "text" if original_file.exists() and final_file.exists() else "artifact"
+
+        if source == "text":
+            for filepath in (original_file, final_file):
+                if not filepath.exists():
+                    raise ValueError(f"Missing sentence file: {filepath}")
+            originals = FileManager.load_sentences(original_file)
+            finals = FileManager.load_sentences(final_file)
+        else:
+            from artifact import artifact_stages, load_run_artifact
+
+            if not artifact_file.exists():
+                raise ValueError(f"No sentence files or run artifact found in {self.run_dir}")
+            stages = artifact_stages(load_run_artifact(artifact_file))
+            if self.chain not in stages:
+                raise ValueError(f"Run artifact has no stage {chain_key(self.chain)}")
+            originals, finals = stages[self.chain[:1]], stages[self.chain]
+
+        if len(originals) != len(finals):
+            raise ValueError(
+                f"Original and final sentence counts differ ({len(originals)} vs {len(finals)})"
+            )
+        return originals, finals
+
+    def analyze(self, source: str = "auto", force: bool = False) -> dict:
+        """
+        Recompute distances for changed pairs and refresh stats and graph.
+
+        Args:
+            source: Where to load sentences from (see load)
+            force: Re-embed every pair and rewrite outputs even if nothing changed
+
+        Returns:
+            Statistics dictionary, with 'reused' and 'recomputed' counts
+        """
+        print("\n" + "="*60)
+        print(f"OFFLINE QUALITY ANALYSIS ({chain_title(self.chain)})")
+        print("="*60)
+
+        originals, finals = self.load(source)
+        cache_file = analysis_cache_file(self.chain, self.run_dir)
+        cache = {} if force else load_analysis_cache(cache_file)
+
+        keys = [pair_key(o, f) for o, f in zip(originals, finals)]
+        distances = [cache.get(key) for key in keys]
+        changed = [i for i, distance in enumerate(distances) if distance is None]
+        print(f"{len(originals) - len(changed)} pairs unchanged, {len(changed)} to re-score")
+
+        # Surface metric statistics are counted only for pairs not cached yet
+        if self.metric_engine is None:
+            self.metric_engine = MetricEngine()
+        metric_cache = {} if force else load_metric_cache(cache_file)
+        metric_rows = {
+            name: [metric_cache.get(name, {}).get(key) for key in keys]
+            for name in self.metric_engine.names
+        }
+        unscored = [
+            i for i in range(len(keys))
+            if any(rows[i] is None for rows in metric_rows.values())
+        ]
+        metric_job = self.metric_engine.submit(
+            [originals[i] for i in unscored], [finals[i] for i in unscored]
+        ) if unscored else None
+
+        if changed:
+            if self.embedding_engine is None:
+                self.embedding_engine = EmbeddingEngine()
+            changed_originals = [originals[i] for i in changed]
+            original_embeddings = self.embedding_engine.encode(changed_originals)
+            new_distances = self.embedding_engine.calculate_cosine_distances(
+                original_embeddings,
+                self.embedding_engine.encode_round_trip(
+                    [finals[i] for i in changed], changed_originals, original_embeddings
+                )
+            )
+            for i, distance in zip(changed, new_distances):
+                distances[i] = distance
+
+        if metric_job is not None:
+            for name, rows in metric_job.statistics().items():
+                for i, row in zip(unscored, rows.tolist()):
+                    metric_rows[name][i] = row
+        statistics = {
+            metric.name: np.array(metric_rows[metric.name], dtype=float).reshape(len(keys), -1)
+            for metric in self.metric_engine.metrics
+        }
+
+        stats = self.stats_calculator.calculate_statistics(distances)
+        stats["chain"] = list(self.chain)
+        stats["reused"] = len(originals) - len(changed)
+        stats["recomputed"] = len(changed)
+        stats["metrics"] = summarize_metrics(self.metric_engine.metrics, statistics)
+
+        metrics_path, graph_path = quality_output_files(self.chain, self.run_dir)
+        if changed or force or not (metrics_path.exists() and graph_path.exists()):
+            self.file_manager.save_metrics(stats, metrics_path)
+            self.visualizer.plot_quality_graph(
+                distances,
+                stats['mean_distance'],
+                graph_path,
+                chain_title(self.chain),
+                metrics=stats["metrics"]
+            )
+            save_analysis_cache(cache_file, originals, finals, distances, statistics)
+        else:
+            if unscored:
+                save_analysis_cache(cache_file, originals, finals, distances, statistics)
+            print("✓ Metrics and graph are up to date")
+
+        self.stats_calculator.print_statistics(stats)
+        return stats
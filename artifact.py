@@ -0,0 +1,172 @@
+"""
+Columnar run artifact.
+
+A run is stored as one Arrow IPC (Feather v2) file with a row per sentence:
+sentence_id, one text column per DAG stage, per-hop confidence, round-trip
+distances and optionally embeddings. The file can be memory-mapped; with
+compression disabled, reads are zero-copy.
+
+Column layout (stage keys as in pipeline.chain_key):
+    sentence_id                 int32
+    he, he-en, he-en-fr, ...    string      (text of each stage)
+    confidence:he-en, ...       float32     (per-hop agent confidence)
+    distance:he-en-fr-he        float64     (round-trip cosine distance)
+    embedding:he, ...           fixed_size_list<float32>  (optional)
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import config
+from pipeline import chain_key, parse_chain, stage_output_file
+from utils import FileManager
+
+CONFIDENCE_PREFIX = "confidence:"
+DISTANCE_PREFIX = "distance:"
+EMBEDDING_PREFIX = "embedding:"
+
+
+def _require_pyarrow():
+    """Import pyarrow, with an actionable error when it is not installed."""
+    try:
+        import pyarrow
+        import pyarrow.feather  # noqa: F401
+    except ImportError:
+        raise RuntimeError(
+            "pyarrow is required for run artifacts. Install it with: pip install pyarrow"
+        )
+    return pyarrow
+
+
+def pyarrow_available() -> bool:
+    """Whether run artifacts can be written in this environment."""
+    try:
+        _require_pyarrow()
+        return True
+    except RuntimeError:
+        return False
+
+
+def write_run_artifact(
+    filepath: Path,
+    stages: Dict[Tuple[str, ...], List[str]],
+    confidences: Optional[Dict[Tuple[str, ...], List[float]]] = None,
+    distances: Optional[Dict[Tuple[str, ...], List[float]]] = None,
+    embeddings: Optional[Dict[Tuple[str, ...], np.ndarray]] = None,
+    metadata: Optional[Dict] = None,
+    compression: str = config.RUN_ARTIFACT_COMPRESSION,
+    sentence_ids: Optional[Sequence[int]] = None
+) -> None:
+    """
+    Write a run to a single columnar file.
+
+    Args:
+        filepath: Output path (Arrow IPC / Feather v2)
+        stages: Stage path -> sentences (the root path holds the originals)
+        confidences: Stage path -> per-sentence agent confidence
+        distances: Round-trip chain -> per-sentence cosine distance
+        embeddings: Stage path -> embedding matrix (rows aligned with sentences)
+        metadata: Extra run metadata stored in the schema (JSON-serializable)
+        compression: 'zstd', 'lz4' or 'uncompressed' (zero-copy reads)
+        sentence_ids: 1-based corpus id of each row (default: 1..N), e.g.
+            for a random sample of a corpus
+    """
+    pa = _require_pyarrow()
+
+    num_rows = len(next(iter(stages.values())))
+    ids = np.arange(1, num_rows + 1) if sentence_ids is None else sentence_ids
+    columns = {"sentence_id": pa.array(np.asarray(ids, dtype=np.int32))}
+
+    for path, sentences in stages.items():
+        columns[chain_key(path)] = pa.array(sentences, type=pa.string())
+    for path, values in (confidences or {}).items():
+        columns[CONFIDENCE_PREFIX + chain_key(path)] = pa.array(values, type=pa.float32())
+    for path, values in (distances or {}).items():
+        columns[DISTANCE_PREFIX + chain_key(path)] = pa.array(values, type=pa.float64())
+    for path, matrix in (embeddings or {}).items():
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        columns[EMBEDDING_PREFIX + chain_key(path)] = pa.FixedSizeListArray.from_arrays(
+            pa.array(matrix.reshape(-1)), matrix.shape[1]
+        )
+
+    schema_metadata = {
+        "stages": json.dumps([chain_key(path) for path in stages]),
+        "created": datetime.now().isoformat(),
+        **{key: json.dumps(value, ensure_ascii=False) for key, value in (metadata or {}).items()}
+    }
+    table = pa.table(columns).replace_schema_metadata(schema_metadata)
+
+    pa.feather.write_feather(table, filepath, compression=compression)
+
+    file_size = filepath.stat().st_size / 1024  # KB
+    print(f"[✓] Saved: {filepath.name} ({num_rows} sentences, "
+          f"{len(columns)} columns, {file_size:.1f} KB)")
+
+
+def load_run_artifact(filepath: Path, memory_map: bool = True):
+    """
+    Load a run artifact as a pyarrow Table.
+
+    Args:
+        filepath: Path to the artifact
+        memory_map: Memory-map the file instead of reading it into memory
+
+    Returns:
+        pyarrow.Table
+    """
+    pa = _require_pyarrow()
+    return pa.feather.read_table(filepath, memory_map=memory_map)
+
+
+def artifact_stages(table) -> Dict[Tuple[str, ...], List[str]]:
+    """
+    Extract stage texts from an artifact table.
+
+    Args:
+        table: Table from load_run_artifact
+
+    Returns:
+        Stage path -> sentences, in DAG order
+    """
+    keys = json.loads(table.schema.metadata[b"stages"])
+    return {parse_chain(key): table.column(key).to_pylist() for key in keys}
+
+
+def artifact_embeddings(table, path: Sequence[str]) -> Optional[np.ndarray]:
+    """
+    Get a stage's embedding matrix from an artifact table, if stored.
+
+    Args:
+        table: Table from load_run_artifact
+        path: Stage path
+
+    Returns:
+        2-D float32 array, or None when embeddings were not stored
+    """
+    name = EMBEDDING_PREFIX + chain_key(path)
+    if name not in table.column_names:
+        return None
+    column = table.column(name).combine_chunks()
+    return column.values.to_numpy().reshape(len(column), -1)
+
+
+def export_text_files(table, output_dir: Path) -> List[Path]:
+    """
+    Export an artifact to the legacy numbered text files.
+
+    Args:
+        table: Table from load_run_artifact
+        output_dir: Directory for the text files
+
+    Returns:
+        Paths of the written files
+    """
+    files = []
+    for path, sentences in artifact_stages(table).items():
+        filepath = stage_output_file(path, output_dir)
+        FileManager.save_sentences(sentences, filepath)
+        files.append(filepath)
+    return files
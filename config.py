@@ -12,12 +12,12 @@ load_dotenv()
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 MODEL_NAME = os.getenv("MODEL_NAME", "claude-sonnet-4-20250514")
 
-# Validate API key
-if not ANTHROPIC_API_KEY:
-    raise ValueError(
-        "ANTHROPIC_API_KEY not found. Please create a .env file with your API key. "
-        "See .env.example for reference."
-    )
+# The API key is validated when the first client is created (agents.get_client),
+# so offline commands such as `main.py analyze` work without one
+MISSING_API_KEY_MESSAGE = (
+    "ANTHROPIC_API_KEY not found. Please create a .env file with your API key. "
+    "See .env.example for reference."
+)
 
 # Directory Configuration
 BASE_DIR = Path(__file__).parent
@@ -30,6 +30,22 @@ ORCHESTRATOR_PROMPT_FILE = PROMPTS_DIR / "orchestrator_prompt.md"
 AGENT1_PROMPT_FILE = PROMPTS_DIR / "agent1_hebrew_to_english_prompt.md"
 AGENT2_PROMPT_FILE = PROMPTS_DIR / "agent2_english_to_french_prompt.md"
 AGENT3_PROMPT_FILE = PROMPTS_DIR / "agent3_french_to_hebrew_prompt.md"
+GENERIC_AGENT_PROMPT_FILE = PROMPTS_DIR / "generic_translator_prompt.md"
+
+# Language Chain Configuration
+# Each chain is a sequence of language codes; consecutive pairs are agent hops.
+# Chains sharing a prefix reuse its translations, and branches run concurrently.
+LANGUAGE_NAMES = {
+    "he": "Hebrew",
+    "en": "English",
+    "fr": "French",
+    "es": "Spanish",
+    "de": "German",
+    "ar": "Arabic",
+    "ru": "Russian"
+}
+DEFAULT_CHAIN = ("he", "en", "fr", "he")
+LANGUAGE_CHAINS = [DEFAULT_CHAIN]
 
 # Translation Configuration
 MAX_SENTENCE_WORDS = 30
@@ -53,9 +69,99 @@ SENTENCES_FRENCH = OUTPUT_DIR / "sentences_french.txt"
 SENTENCES_HEBREW_FINAL = OUTPUT_DIR / "sentences_hebrew_final.txt"
 QUALITY_METRICS_FILE = OUTPUT_DIR / "quality_metrics.json"
 QUALITY_GRAPH_FILE = OUTPUT_DIR / "translation_quality_graph.png"
+PERFORMANCE_METRICS_FILE = OUTPUT_DIR / "performance_metrics.json"
+RUN_ARTIFACT_FILE = OUTPUT_DIR / "run.arrow"
+QUEUE_FILE = OUTPUT_DIR / "work_queue.sqlite"
+ANALYSIS_CACHE_FILE = OUTPUT_DIR / "analysis_cache.json"
+INDEX_DIR = OUTPUT_DIR / "drift_index"  # Shared by all runs (see vector_index.py)
+
+# Stage outputs of the default chain keep their historical file names;
+# other stages are written as sentences_<path>.txt (e.g. sentences_he-en-es.txt)
+LEGACY_STAGE_FILES = {
+    ("he",): SENTENCES_HEBREW_ORIGINAL,
+    ("he", "en"): SENTENCES_ENGLISH,
+    ("he", "en", "fr"): SENTENCES_FRENCH,
+    ("he", "en", "fr", "he"): SENTENCES_HEBREW_FINAL
+}
 
 # API Configuration
 API_TIMEOUT = 30
 MAX_RETRIES = 3
 MAX_TOKENS = 4096
 TEMPERATURE = 0.3  # Lower temperature for more consistent translations
+
+# Sentence Generation Configuration
+STREAM_GENERATION = True  # Start first-hop translations while sentences are still generated
+
+# Response Size Configuration
+LEAN_RESPONSES = True  # Agents return only {"translation", "confidence"}
+BYTES_PER_TOKEN = 4  # UTF-8 bytes per token, used to estimate source length
+RESPONSE_TOKEN_OVERHEAD = 32  # JSON wrapper and confidence field
+RESPONSE_TOKENS_PER_SOURCE_TOKEN = 3  # Headroom for target-language expansion
+# Extra response headroom per target language: non-Latin scripts need more
+# tokens per word than the Latin-calibrated BYTES_PER_TOKEN estimate suggests
+TARGET_TOKEN_HEADROOM = {"he": 2.0, "ar": 2.0, "ru": 1.5}
+MIN_RESPONSE_TOKENS = 64
+
+# Sweep Configuration
+SWEEP_MAX_PARALLEL = 4  # Concurrent configurations in one sweep process
+
+# Sequential Sampling Configuration (estimate mean distance without translating everything)
+SAMPLING_ROUND_SIZE = 10  # Sentences translated and scored per round
+SAMPLING_MIN_SAMPLES = 20  # Never stop before this many sentences
+SAMPLING_TARGET_WIDTH = 0.01  # Stop once the confidence interval is this narrow
+SAMPLING_CONFIDENCE = 0.95
+SAMPLING_MAX_API_CALLS = None  # Optional cost budget (translation calls)
+
+# Model Routing Configuration
+# With routing enabled, agents translate on the fast tier first and re-run only
+# failed or low-confidence sentences on the next tier (ending at MODEL_NAME).
+FAST_MODEL_NAME = os.getenv("FAST_MODEL_NAME", "claude-3-5-haiku-latest")
+ROUTING_ENABLED = False
+ESCALATION_THRESHOLD = 0.7
+# Per-agent overrides, e.g.
+# {"agent3_french_to_hebrew": {"models": ["claude-3-5-haiku-latest", MODEL_NAME], "threshold": 0.85}}
+AGENT_ROUTING = {}
+# Model -> per-call latency (s) of the strong-only baseline in the routing gain;
+# models not listed use their recently measured mean latency
+ROUTING_BASELINE_LATENCY_S = {}
+
+# Run Artifact Configuration
+WRITE_RUN_ARTIFACT = True  # Single columnar file per run (requires pyarrow)
+RUN_ARTIFACT_COMPRESSION = "zstd"  # "zstd", "lz4" or "uncompressed" (zero-copy reads)
+STORE_EMBEDDINGS = False  # Include embedding columns in the artifact
+EXPORT_TEXT_FILES = False  # Also write the legacy [N] sentence text files (always without pyarrow)
+
+# Quality Metrics Configuration (computed alongside the cosine distance)
+QUALITY_METRICS = ["chrf", "bleu", "edit_distance"]  # Names registered in metrics.py
+METRIC_WORKERS = None  # Worker processes (None: one per CPU)
+METRIC_CHUNK_SIZE = 200  # Most sentence pairs per task (runs are split across workers)
+METRIC_INLINE_PAIRS = 8  # Runs of at most this many pairs are scored inline
+
+# Drift Index Configuration
+UPDATE_DRIFT_INDEX = True  # Append each analyzed round trip to INDEX_DIR
+
+# Sharded Execution Configuration (coordinator/worker mode)
+QUEUE_SHARD_SIZE = 10  # Sentences per shard
+QUEUE_LOCAL_WORKERS = 4  # Worker processes started by the coordinator
+QUEUE_LEASE_SECONDS = 300  # Shards of silent workers are reassigned after this
+QUEUE_POLL_SECONDS = 2
+QUEUE_MAX_ATTEMPTS = 3  # Attempts before a shard is marked failed
+QUEUE_BUSY_TIMEOUT = 30  # Seconds to wait for the SQLite lock
+
+# Hedged Request Configuration (cut tail latency of slow API calls)
+HEDGING_ENABLED = False
+HEDGE_PERCENTILE = 90  # Hedge calls running longer than this latency percentile
+HEDGE_MIN_SAMPLES = 10  # Latencies to observe before hedging starts
+HEDGE_WINDOW = 100  # Recent latencies kept per model
+HEDGE_MAX_FRACTION = 0.1  # At most this fraction of a batch's sentences get a hedge
+HEDGE_MAX_WORKERS = 8  # Threads issuing primary and hedge requests
+
+# Server Configuration (main.py serve)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_MAX_BATCH_SENTENCES = 64  # Sentences coalesced into one micro-batch
+SERVER_BATCH_WAIT_MS = 20  # How long a batch waits for more requests
+SERVER_MAX_PENDING_SENTENCES = 512  # Queued sentences before requests get 503
+SERVER_RETRY_AFTER_S = 5  # Retry-After header of 503 responses
+SERVER_TRANSLATION_CONCURRENCY = 8  # Concurrent API calls per hop within a batch
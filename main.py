@@ -14,36 +14,27 @@ Architecture:
 Usage:
   python main.py --sentences 20 --round-trip
   python main.py --sentences 50 --no-round-trip --topic "technology"
+  python main.py sweep sweep.json
+  python main.py export output/run.arrow
+  python main.py coordinate -n 100 --workers 4
+  python main.py worker output/work_queue.sqlite
+  python main.py analyze output/
+  python main.py index query "השמש זורחת בבוקר" -k 5
+  python main.py serve --port 8765
   python main.py --help
 """
 
 import argparse
 import sys
+from pathlib import Path
 from orchestrator import OrchestratorAgent
+from pipeline import parse_chain
+from utils import FileManager, print_file_summary
 import config
 
 
-def parse_arguments():
-    """Parse command line arguments."""
-    parser = argparse.ArgumentParser(
-        description="Multi-Agent Translation System with Round-Trip Quality Analysis",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-Examples:
-  # Generate 20 sentences with round-trip analysis
-  python main.py --sentences 20
-
-  # Generate 50 sentences without round-trip analysis
-  python main.py --sentences 50 --no-round-trip
-
-  # Generate 30 sentences on a specific topic
-  python main.py --sentences 30 --topic "science and technology"
-
-  # Use custom number of sentences
-  python main.py -n 15
-        """
-    )
-
+def add_run_arguments(parser):
+    """Add the options shared by normal runs and the coordinator."""
     parser.add_argument(
         '-n', '--sentences',
         type=int,
@@ -72,6 +63,138 @@ Examples:
         help='Optional topic/domain for sentence generation (e.g., "technology", "nature")'
     )
 
+    parser.add_argument(
+        '--full-responses',
+        action='store_false',
+        dest='lean_responses',
+        default=config.LEAN_RESPONSES,
+        help='Request the full agent JSON schema with a fixed max_tokens '
+             '(baseline for latency/token comparisons)'
+    )
+
+    parser.add_argument(
+        '--route',
+        action='store_true',
+        default=config.ROUTING_ENABLED,
+        help='Translate with the fast model (FAST_MODEL_NAME) first and re-run only '
+             'low-confidence or failed sentences on MODEL_NAME'
+    )
+
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        default=config.HEDGING_ENABLED,
+        help=f'Fire a duplicate request when a call exceeds the p{config.HEDGE_PERCENTILE} '
+             f'latency (at most {config.HEDGE_MAX_FRACTION:.0%} of sentences per agent)'
+    )
+
+    parser.add_argument(
+        '--text-files',
+        action='store_true',
+        default=config.EXPORT_TEXT_FILES,
+        help='Also write the legacy per-stage text files next to the columnar run '
+             'artifact (run.arrow); always written when pyarrow is not installed'
+    )
+
+    parser.add_argument(
+        '--store-embeddings',
+        action='store_true',
+        default=config.STORE_EMBEDDINGS,
+        help='Include original and final embeddings in the run artifact'
+    )
+
+    parser.add_argument(
+        '--input',
+        type=str,
+        default=None,
+        help='Load Hebrew sentences from a file (one per line, optional "[N] " '
+             'prefix) instead of generating them; --sentences is then ignored'
+    )
+
+    parser.add_argument(
+        '--sample',
+        action='store_true',
+        help='Estimate mean round-trip distance by sequential random sampling, '
+             'stopping once the confidence interval is narrow enough'
+    )
+
+    parser.add_argument(
+        '--ci-width',
+        type=float,
+        default=config.SAMPLING_TARGET_WIDTH,
+        help=f'Target confidence interval width for --sample (default: {config.SAMPLING_TARGET_WIDTH})'
+    )
+
+    parser.add_argument(
+        '--max-api-calls',
+        type=int,
+        default=config.SAMPLING_MAX_API_CALLS,
+        help='Translation API call budget for --sample (default: unlimited)'
+    )
+
+    parser.add_argument(
+        '--round-size',
+        type=int,
+        default=config.SAMPLING_ROUND_SIZE,
+        help=f'Sentences per sampling round for --sample (default: {config.SAMPLING_ROUND_SIZE})'
+    )
+
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed for a reproducible --sample'
+    )
+
+    parser.add_argument(
+        '--chain',
+        action='append',
+        type=parse_chain,
+        dest='chains',
+        default=None,
+        help='Language chain to run, e.g. "he,en,es,he". Repeat for several '
+             'chains; shared prefixes are translated once. Default: he,en,fr,he'
+    )
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Multi-Agent Translation System with Round-Trip Quality Analysis",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Generate 20 sentences with round-trip analysis
+  python main.py --sentences 20
+
+  # Generate 50 sentences without round-trip analysis
+  python main.py --sentences 50 --no-round-trip
+
+  # Generate 30 sentences on a specific topic
+  python main.py --sentences 30 --topic "science and technology"
+
+  # Use custom number of sentences
+  python main.py -n 15
+
+  # Compare two round-trip chains sharing the Hebrew → English stage
+  python main.py -n 20 --chain he,en,fr,he --chain he,en,es,he
+
+  # Estimate mean distance of a large corpus to ±0.005 with at most 600 API calls
+  python main.py --input corpus_he.txt --sample --ci-width 0.01 --max-api-calls 600
+
+  # Tiered routing: fast model first, escalate low-confidence sentences
+  python main.py -n 30 --route
+
+  # Hedge slow API calls to cut tail latency
+  python main.py -n 50 --hedge
+
+  # Baseline run with the full response schema (compare performance_metrics.json)
+  python main.py -n 20 --full-responses
+        """
+    )
+
+    add_run_arguments(parser)
+
     return parser.parse_args()
 
 
@@ -79,11 +202,21 @@ def validate_arguments(args):
     """Validate command line arguments."""
     errors = []
 
-    # Validate number of sentences
-    if args.sentences < config.MIN_SENTENCES:
-        errors.append(f"Number of sentences must be at least {config.MIN_SENTENCES}")
-    if args.sentences > config.MAX_SENTENCES:
-        errors.append(f"Number of sentences must not exceed {config.MAX_SENTENCES}")
+    # Validate number of sentences (only used when generating)
+    if args.input is None:
+        if args.sentences < config.MIN_SENTENCES:
+            errors.append(f"Number of sentences must be at least {config.MIN_SENTENCES}")
+        if args.sentences > config.MAX_SENTENCES:
+            errors.append(f"Number of sentences must not exceed {config.MAX_SENTENCES}")
+    elif not Path(args.input).is_file():
+        errors.append(f"Input file not found: {args.input}")
+
+    # Validate sampling options
+    if args.sample:
+        if args.ci_width <= 0:
+            errors.append("--ci-width must be positive")
+        if args.round_size < 1:
+            errors.append("--round-size must be at least 1")
 
     if errors:
         print("Error: Invalid arguments\n", file=sys.stderr)
@@ -93,22 +226,537 @@ def validate_arguments(args):
         sys.exit(1)
 
 
-def main():
-    """Main entry point."""
+def parse_sweep_arguments(argv):
+    """Parse arguments of the sweep subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="main.py sweep",
+        description="Run a grid of configurations in one process, sharing the "
+                    "API client, embedding model and generated corpora",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Grid file example (sweep.json):
+  {
+    "num_sentences": 20,
+    "grid": {"topic": ["technology", "nature"], "temperature": [0.0, 0.3]},
+    "runs": [{"model": "claude-3-5-haiku-latest"}],
+    "max_parallel": 4
+  }
+        """
+    )
+
+    parser.add_argument('grid', type=str, help='Path to the JSON grid file')
+
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        default=None,
+        help=f'Maximum concurrent configurations (default: grid value or {config.SWEEP_MAX_PARALLEL})'
+    )
+
+    parser.add_argument(
+        '--output-dir',
+        type=str,
+        default=None,
+        help='Sweep output directory (default: output/sweep_<timestamp>)'
+    )
+
+    return parser.parse_args(argv)
+
+
+def parse_export_arguments(argv):
+    """Parse arguments of the export subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="main.py export",
+        description="Export a columnar run artifact to the legacy numbered text files"
+    )
+
+    parser.add_argument(
+        'artifact',
+        type=str,
+        nargs='?',
+        default=str(config.RUN_ARTIFACT_FILE),
+        help=f'Path to the run artifact (default: {config.RUN_ARTIFACT_FILE})'
+    )
+
+    parser.add_argument(
+        '--output-dir',
+        type=str,
+        default=None,
+        help='Directory for the text files (default: the artifact\'s directory)'
+    )
+
+    return parser.parse_args(argv)
+
+
+def parse_coordinate_arguments(argv):
+    """Parse arguments of the coordinate subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="main.py coordinate",
+        description="Shard the corpus into a SQLite work queue, run worker "
+                    "processes on it and merge their results into the normal outputs",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # 4 local workers over a 100-sentence generated corpus
+  python main.py coordinate -n 100 --workers 4
+
+  # Queue on a shared filesystem, workers started on other hosts
+  python main.py coordinate --input corpus_he.txt --queue /shared/q.sqlite --workers 0
+  python main.py worker /shared/q.sqlite         # on each host
+        """
+    )
+
+    add_run_arguments(parser)
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=config.QUEUE_LOCAL_WORKERS,
+        help=f'Local worker processes to start; 0 relies on external workers (default: {config.QUEUE_LOCAL_WORKERS})'
+    )
+
+    parser.add_argument(
+        '--shard-size',
+        type=int,
+        default=config.QUEUE_SHARD_SIZE,
+        help=f'Sentences per shard (default: {config.QUEUE_SHARD_SIZE})'
+    )
+
+    parser.add_argument(
+        '--queue',
+        type=str,
+        default=str(config.QUEUE_FILE),
+        help=f'Path to the SQLite work queue (default: {config.QUEUE_FILE})'
+    )
+
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue an existing queue with the chains and agent options it was '
+             'created with (conflicting options are rejected)'
+    )
+
+    return parser.parse_args(argv)
+
+
+def parse_worker_arguments(argv):
+    """Parse arguments of the worker subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="main.py worker",
+        description="Process shards from a work queue created by 'main.py coordinate'"
+    )
+
+    parser.add_argument(
+        'queue',
+        type=str,
+        nargs='?',
+        default=str(config.QUEUE_FILE),
+        help=f'Path to the SQLite work queue (default: {config.QUEUE_FILE})'
+    )
+
+    parser.add_argument(
+        '--keep-polling',
+        action='store_true',
+        help='Keep waiting for work after the queue is finished'
+    )
+
+    return parser.parse_args(argv)
+
+
+def parse_analyze_arguments(argv):
+    """Parse arguments of the analyze subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="main.py analyze",
+        description="Re-score an existing run offline. Only sentence pairs whose "
+                    "original or final text changed since the last analysis are re-embedded"
+    )
+
+    parser.add_argument(
+        'run_dir',
+        type=str,
+        nargs='?',
+        default=str(config.OUTPUT_DIR),
+        help=f'Directory of a previous run (default: {config.OUTPUT_DIR})'
+    )
+
+    parser.add_argument(
+        '--chain',
+        action='append',
+        type=parse_chain,
+        dest='chains',
+        default=None,
+        help='Round-trip chain to analyze, e.g. "he,en,es,he" (repeatable). Default: he,en,fr,he'
+    )
+
+    parser.add_argument(
+        '--source',
+        choices=['auto', 'text', 'artifact'],
+        default='auto',
+        help='Load sentences from the text files or run.arrow (default: text files if present)'
+    )
+
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Ignore the cache and re-score every sentence'
+    )
+
+    return parser.parse_args(argv)
+
+
+def parse_index_arguments(argv):
+    """Parse arguments of the index subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="main.py index",
+        description="Search round trips of all past runs. Runs are indexed "
+                    "automatically after analysis; 'add' indexes older run directories"
+    )
+    parser.add_argument(
+        '--index-dir',
+        type=str,
+        default=str(config.INDEX_DIR),
+        help=f'Index directory (default: {config.INDEX_DIR})'
+    )
+    actions = parser.add_subparsers(dest='action', required=True)
+
+    add = actions.add_parser('add', help='Index existing run directories')
+    add.add_argument('run_dirs', type=str, nargs='+', help='Directories of previous runs')
+    add.add_argument(
+        '--chain',
+        action='append',
+        type=parse_chain,
+        dest='chains',
+        default=None,
+        help='Round-trip chain to index (repeatable). Default: he,en,fr,he'
+    )
+    add.add_argument(
+        '--source',
+        choices=['auto', 'text', 'artifact'],
+        default='auto',
+        help='Load sentences from the text files or run.arrow (default: text files if present)'
+    )
+
+    query = actions.add_parser('query', help='Find past sentences similar to a sentence')
+    query.add_argument('text', type=str, help='Query sentence')
+    query.add_argument('-k', type=int, default=5, help='Number of neighbors (default: 5)')
+    query.add_argument(
+        '--field',
+        choices=['original', 'final'],
+        default='original',
+        help='Match against original or final Hebrew sentences (default: original)'
+    )
+
+    drift = actions.add_parser('drift', help='Show the sentences that drifted most')
+    drift.add_argument('-k', type=int, default=10, help='Number of sentences (default: 10)')
+
+    return parser.parse_args(argv)
+
+
+def parse_serve_arguments(argv):
+    """Parse arguments of the serve subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="main.py serve",
+        description="Serve translate and round-trip-score endpoints over local HTTP, "
+                    "keeping the agents and embedding model warm"
+    )
+
+    parser.add_argument(
+        '--host',
+        type=str,
+        default=config.SERVER_HOST,
+        help=f'Interface to bind (default: {config.SERVER_HOST})'
+    )
+
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=config.SERVER_PORT,
+        help=f'Port (default: {config.SERVER_PORT})'
+    )
+
+    parser.add_argument(
+        '--max-batch',
+        type=int,
+        default=config.SERVER_MAX_BATCH_SENTENCES,
+        help=f'Sentences per micro-batch (default: {config.SERVER_MAX_BATCH_SENTENCES})'
+    )
+
+    parser.add_argument(
+        '--batch-wait-ms',
+        type=float,
+        default=config.SERVER_BATCH_WAIT_MS,
+        help=f'Time a batch waits for more requests (default: {config.SERVER_BATCH_WAIT_MS})'
+    )
+
+    parser.add_argument(
+        '--max-pending',
+        type=int,
+        default=config.SERVER_MAX_PENDING_SENTENCES,
+        help=f'Queued sentences before requests are rejected with 503 '
+             f'(default: {config.SERVER_MAX_PENDING_SENTENCES})'
+    )
+
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=config.SERVER_TRANSLATION_CONCURRENCY,
+        help=f'Concurrent API calls per hop within a batch '
+             f'(default: {config.SERVER_TRANSLATION_CONCURRENCY})'
+    )
+
+    parser.add_argument(
+        '--chain',
+        action='append',
+        type=parse_chain,
+        dest='chains',
+        default=None,
+        help='Language chain to serve (repeatable). Default: he,en,fr,he'
+    )
+
+    parser.add_argument(
+        '--full-responses',
+        action='store_false',
+        dest='lean_responses',
+        default=config.LEAN_RESPONSES,
+        help='Request the full agent JSON schema'
+    )
+
+    parser.add_argument(
+        '--route',
+        action='store_true',
+        default=config.ROUTING_ENABLED,
+        help='Translate with the fast model first, escalating low-confidence sentences'
+    )
+
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        default=config.HEDGING_ENABLED,
+        help='Fire duplicate requests for slow API calls'
+    )
+
+    return parser.parse_args(argv)
+
+
+def build_orchestrator(args, output_dir=None):
+    """Create an orchestrator from the shared run options."""
+    return OrchestratorAgent(
+        lean_responses=args.lean_responses,
+        chains=args.chains,
+        routing=args.route,
+        hedging=args.hedge,
+        export_text_files=args.text_files,
+        store_embeddings=args.store_embeddings,
+        output_dir=output_dir
+    )
+
+
+def run_default():
+    """Run a single orchestrated translation session."""
     # Parse and validate arguments
     args = parse_arguments()
     validate_arguments(args)
 
-    try:
-        # Initialize orchestrator
-        orchestrator = OrchestratorAgent()
-
-        # Run the system
-        orchestrator.run(
-            num_sentences=args.sentences,
-            round_trip=args.round_trip,
-            topic=args.topic
+    # Initialize orchestrator
+    orchestrator = build_orchestrator(args)
+
+    hebrew_original = None
+    if args.input:
+        hebrew_original = FileManager.load_sentences(Path(args.input))
+
+    sampling = None
+    if args.sample:
+        sampling = {
+            "target_width": args.ci_width,
+            "max_api_calls": args.max_api_calls,
+            "round_size": args.round_size,
+            "seed": args.seed
+        }
+
+    # Run the system
+    orchestrator.run(
+        num_sentences=args.sentences,
+        round_trip=args.round_trip,
+        topic=args.topic,
+        hebrew_original=hebrew_original,
+        sampling=sampling
+    )
+
+
+def run_sweep():
+    """Run an experiment sweep."""
+    from sweep import SweepRunner
+
+    args = parse_sweep_arguments(sys.argv[2:])
+    SweepRunner(args.grid, max_parallel=args.parallel, output_dir=args.output_dir).run()
+
+
+def run_export():
+    """Export a run artifact to text files."""
+    from artifact import export_text_files, load_run_artifact
+
+    args = parse_export_arguments(sys.argv[2:])
+    artifact_path = Path(args.artifact)
+    output_dir = Path(args.output_dir) if args.output_dir else artifact_path.parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    export_text_files(load_run_artifact(artifact_path), output_dir)
+
+
+def run_coordinate():
+    """Run the coordinator of a sharded multi-worker job."""
+    from work_queue import Coordinator, WorkQueue, job_conflicts, orchestrator_from_job
+
+    args = parse_coordinate_arguments(sys.argv[2:])
+    validate_arguments(args)
+    if args.sample:
+        raise ValueError("--sample is not supported by the coordinator")
+
+    queue_path = Path(args.queue)
+    queue_path.parent.mkdir(parents=True, exist_ok=True)
+    if args.resume:
+        # The run keeps the configuration it was queued with
+        job = WorkQueue(queue_path).job()
+        requested = {
+            key: value for key, value, default in (
+                ("chains", args.chains, None),
+                ("lean_responses", args.lean_responses, config.LEAN_RESPONSES),
+                ("routing", args.route, config.ROUTING_ENABLED),
+                ("hedging", args.hedge, config.HEDGING_ENABLED),
+                ("round_trip", args.round_trip, True)
+            ) if value != default
+        }
+        conflicts = job_conflicts(job, requested)
+        if conflicts:
+            raise ValueError(
+                "--resume options conflict with the queued job ("
+                + "; ".join(conflicts) + "); drop them to resume"
+            )
+        orchestrator = orchestrator_from_job(
+            job, queue_path.parent,
+            export_text_files=args.text_files,
+            store_embeddings=args.store_embeddings
         )
+    else:
+        orchestrator = build_orchestrator(args, output_dir=queue_path.parent)
+    coordinator = Coordinator(queue_path, orchestrator)
+
+    if args.resume:
+        coordinator.resume()
+    else:
+        if args.input:
+            hebrew_original = FileManager.load_sentences(Path(args.input))
+        else:
+            hebrew_original = orchestrator.generate_hebrew_sentences(args.sentences, args.topic)
+        coordinator.submit(hebrew_original, args.shard_size, args.round_trip)
+
+    processes = coordinator.launch_workers(args.workers) if args.workers > 0 else []
+    coordinator.wait(processes)
+    files = coordinator.write_outputs(coordinator.merge())
+    print_file_summary(files)
+
+
+def run_analyze():
+    """Re-score an existing run offline."""
+    from analysis import IncrementalAnalyzer
+
+    args = parse_analyze_arguments(sys.argv[2:])
+    embedding_engine = metric_engine = None
+    try:
+        for chain in args.chains or [config.DEFAULT_CHAIN]:
+            if chain[0] != chain[-1]:
+                raise ValueError(f"Chain {','.join(chain)} is not a round trip")
+            analyzer = IncrementalAnalyzer(
+                Path(args.run_dir), chain, embedding_engine, metric_engine
+            )
+            analyzer.analyze(source=args.source, force=args.force)
+            embedding_engine = analyzer.embedding_engine
+            metric_engine = analyzer.metric_engine
+    finally:
+        if metric_engine is not None:
+            metric_engine.close()
+
+
+def run_index():
+    """Update or search the cross-run drift index."""
+    from vector_index import DriftIndex, index_run_dir, print_neighbors, timed
+
+    args = parse_index_arguments(sys.argv[2:])
+    index = DriftIndex(Path(args.index_dir))
+
+    if args.action == 'add':
+        embedding_engine = None
+        for run_dir in args.run_dirs:
+            for chain in args.chains or [config.DEFAULT_CHAIN]:
+                if chain[0] != chain[-1]:
+                    raise ValueError(f"Chain {','.join(chain)} is not a round trip")
+                embedding_engine = index_run_dir(
+                    index, Path(run_dir), chain, embedding_engine, source=args.source
+                )
+        return
+
+    if not index.size:
+        raise ValueError(f"Drift index {args.index_dir} is empty; run an analysis or 'index add' first")
+
+    if args.action == 'query':
+        from utils import EmbeddingEngine
+
+        query_embedding = EmbeddingEngine().encode([args.text])[0]
+        rows, elapsed_ms = timed(index.search, query_embedding, k=args.k, field=args.field)
+        title = f"NEAREST {args.field.upper()} SENTENCES ({index.size} indexed)"
+    else:
+        rows, elapsed_ms = timed(index.most_drifted, k=args.k)
+        title = f"MOST DRIFTED SENTENCES ({index.size} indexed)"
+    print_neighbors(rows, elapsed_ms, title)
+
+
+def run_serve():
+    """Run the long-running round-trip service."""
+    from server import serve
+
+    args = parse_serve_arguments(sys.argv[2:])
+    orchestrator = OrchestratorAgent(
+        lean_responses=args.lean_responses,
+        chains=args.chains,
+        routing=args.route,
+        hedging=args.hedge
+    )
+    serve(
+        orchestrator,
+        host=args.host,
+        port=args.port,
+        max_batch_sentences=args.max_batch,
+        batch_wait_ms=args.batch_wait_ms,
+        max_pending_sentences=args.max_pending,
+        translation_concurrency=args.concurrency
+    )
+
+
+def run_worker():
+    """Run a worker of a sharded multi-worker job."""
+    from work_queue import run_worker as process_queue
+
+    args = parse_worker_arguments(sys.argv[2:])
+    process_queue(Path(args.queue), exit_when_idle=not args.keep_polling)
+
+
+# Subcommands selected by the first argument; anything else is a normal run
+COMMANDS = {
+    "sweep": run_sweep,
+    "export": run_export,
+    "coordinate": run_coordinate,
+    "worker": run_worker,
+    "analyze": run_analyze,
+    "index": run_index,
+    "serve": run_serve
+}
+
+
+def main():
+    """Main entry point."""
+    command = COMMANDS.get(sys.argv[1], run_default) if len(sys.argv) > 1 else run_default
+
+    try:
+        command()
 
     except KeyboardInterrupt:
         print("\n\nOperation cancelled by user.", file=sys.stderr)
@@ -0,0 +1,376 @@
+"""
+Surface-level round-trip quality metrics (chrF, BLEU, edit distance).
+
+Metrics are plug-ins: each turns a chunk of (original, final) pairs into a
+matrix of per-sentence sufficient statistics. Chunks are counted in a process
+pool, running alongside embedding, and scores are then derived from the
+statistics with NumPy, both per sentence and for the whole corpus.
+
+To add a metric, subclass Metric (in an importable module, since instances
+are pickled to the worker processes) and call register_metric.
+"""
+import math
+import multiprocessing
+import os
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import config
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+class Metric(ABC):
+    """Base class of quality metric plug-ins."""
+
+    name = ""
+    label = ""
+    higher_is_better = True
+
+    @abstractmethod
+    def statistics(self, originals: List[str], finals: List[str]) -> np.ndarray:
+        """
+        Count per-sentence sufficient statistics.
+
+        Args:
+            originals: Original sentences (references)
+            finals: Round-trip sentences (hypotheses)
+
+        Returns:
+            Float array of shape [sentences, num_statistics]
+        """
+
+    @abstractmethod
+    def scores(self, statistics: np.ndarray) -> np.ndarray:
+        """
+        Compute scores from statistics, one per row.
+
+        Args:
+            statistics: Array of shape [rows, num_statistics]; a corpus score
+                is the score of the column sums
+
+        Returns:
+            Scores in [0, 1]
+        """
+
+    def corpus_score(self, totals: np.ndarray) -> float:
+        """
+        Compute the corpus score from statistics summed over all sentences.
+
+        Args:
+            totals: Array of shape [num_statistics]
+
+        Returns:
+            Score in [0, 1]
+        """
+        return float(self.scores(totals.reshape(1, -1))[0])
+
+
+def _ngram_matches(
+    reference: Sequence,
+    hypothesis: Sequence,
+    max_order: int
+) -> List[float]:
+    """Clipped matches, hypothesis and reference n-gram counts for n = 1..max_order."""
+    row = []
+    for n in range(1, max_order + 1):
+        reference_ngrams = Counter(tuple(reference[i:i + n]) for i in range(len(reference) - n + 1))
+        hypothesis_ngrams = Counter(tuple(hypothesis[i:i + n]) for i in range(len(hypothesis) - n + 1))
+        row += [
+            sum((reference_ngrams & hypothesis_ngrams).values()),
+            sum(hypothesis_ngrams.values()),
+            sum(reference_ngrams.values())
+        ]
+    return row
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise division that yields 0 where the denominator is 0."""
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros_like(numerator, dtype=float),
+        where=denominator > 0
+    )
+
+
+class ChrF(Metric):
+    """Character n-gram F-score (chrF, Popović 2015), whitespace ignored."""
+
+    name = "chrf"
+    label = "chrF"
+
+    def __init__(self, max_order: int = 6, beta: float = 2.0):
+        self.max_order = max_order
+        self.beta = beta
+
+    def statistics(self, originals: List[str], finals: List[str]) -> np.ndarray:
+        return np.array([
+            _ngram_matches(
+                "".join(original.split()),
+                "".join(final.split()),
+                self.max_order
+            )
+            for original, final in zip(originals, finals)
+        ], dtype=float).reshape(len(originals), 3 * self.max_order)
+
+    def scores(self, statistics: np.ndarray) -> np.ndarray:
+        matches, hypothesis, reference = (statistics[:, i::3] for i in range(3))
+        # Average precision and recall over the orders present in each row
+        orders = np.maximum((hypothesis > 0).sum(axis=1), 1)
+        precision = _safe_divide(matches, hypothesis).sum(axis=1) / orders
+        recall = _safe_divide(matches, reference).sum(axis=1) / np.maximum((reference > 0).sum(axis=1), 1)
+        beta2 = self.beta ** 2
+        return _safe_divide((1 + beta2) * precision * recall, beta2 * precision + recall)
+
+
+class BLEU(Metric):
+    """BLEU over word tokens; sentence scores use add-one smoothing for n > 1."""
+
+    name = "bleu"
+    label = "BLEU"
+
+    def __init__(self, max_order: int = 4):
+        self.max_order = max_order
+
+    def statistics(self, originals: List[str], finals: List[str]) -> np.ndarray:
+        rows = []
+        for original, final in zip(originals, finals):
+            reference = TOKEN_PATTERN.findall(original)
+            hypothesis = TOKEN_PATTERN.findall(final)
+            # Keep matches and hypothesis totals per order, then the two lengths
+            counts = _ngram_matches(reference, hypothesis, self.max_order)
+            row = [value for i, value in enumerate(counts) if i % 3 != 2]
+            rows.append(row + [len(hypothesis), len(reference)])
+        return np.array(rows, dtype=float).reshape(len(originals), 2 * self.max_order + 2)
+
+    def scores(self, statistics: np.ndarray) -> np.ndarray:
+        return self._bleu(statistics, smoothing=1.0)
+
+    def corpus_score(self, totals: np.ndarray) -> float:
+        return float(self._bleu(totals.reshape(1, -1), smoothing=0.0)[0])
+
+    def _bleu(self, statistics: np.ndarray, smoothing: float) -> np.ndarray:
+        """BLEU per row, adding smoothing to the counts of orders n > 1."""
+        matches = statistics[:, 0:2 * self.max_order:2]
+        totals = statistics[:, 1:2 * self.max_order:2]
+        hypothesis_length, reference_length = statistics[:, -2], statistics[:, -1]
+
+        offsets = np.full(self.max_order, smoothing)
+        offsets[0] = 0.0
+        precision = _safe_divide(matches + offsets, totals + offsets)
+        with np.errstate(divide='ignore'):
+            geometric_mean = np.exp(np.log(precision).mean(axis=1))
+
+        brevity_penalty = np.exp(np.minimum(0.0, 1 - _safe_divide(reference_length, hypothesis_length)))
+        return np.where(hypothesis_length > 0, brevity_penalty * geometric_mean, 0.0)
+
+
+class EditDistance(Metric):
+    """Character Levenshtein distance normalized by the longer sentence."""
+
+    name = "edit_distance"
+    label = "Edit Distance"
+    higher_is_better = False
+
+    @staticmethod
+    def levenshtein(source: str, target: str) -> int:
+        """
+        Levenshtein distance with one NumPy pass per character of source.
+
+        Deletions and substitutions of a DP row are vectorized; insertions are
+        resolved with a running minimum over (row - column) + column.
+        """
+        if not source or not target:
+            return max(len(source), len(target))
+        target_codes = np.frombuffer(target.encode('utf-32-le'), dtype=np.uint32)
+        columns = np.arange(len(target) + 1)
+        row = columns.copy()
+        for i, char in enumerate(source, 1):
+            cost = (target_codes != ord(char)).astype(np.int64)
+            candidate = np.empty_like(row)
+            candidate[0] = i
+            candidate[1:] = np.minimum(row[1:] + 1, row[:-1] + cost)
+            row = np.minimum.accumulate(candidate - columns) + columns
+        return int(row[-1])
+
+    def statistics(self, originals: List[str], finals: List[str]) -> np.ndarray:
+        return np.array([
+            [self.levenshtein(original, final), max(len(original), len(final))]
+            for original, final in zip(originals, finals)
+        ], dtype=float).reshape(len(originals), 2)
+
+    def scores(self, statistics: np.ndarray) -> np.ndarray:
+        return _safe_divide(statistics[:, 0], statistics[:, 1])
+
+
+METRICS: Dict[str, Metric] = {}
+
+
+def register_metric(metric: Metric) -> None:
+    """Make a metric available by name (e.g. in config.QUALITY_METRICS)."""
+    if not isinstance(metric, Metric):
+        raise TypeError(f"{metric!r} is not a Metric instance")
+    if not metric.name:
+        raise ValueError(f"{type(metric).__name__} has no name")
+    METRICS[metric.name] = metric
+
+
+for _metric in (ChrF(), BLEU(), EditDistance()):
+    register_metric(_metric)
+
+
+def _chunk_statistics(
+    metrics: Sequence[Metric],
+    originals: List[str],
+    finals: List[str]
+) -> Dict[str, np.ndarray]:
+    """Count the statistics of all metrics for one chunk (runs in a worker process)."""
+    return {metric.name: metric.statistics(originals, finals) for metric in metrics}
+
+
+class MetricEngine:
+    """Evaluates several metrics over chunks of sentence pairs in a process pool."""
+
+    def __init__(
+        self,
+        names: Optional[Sequence[str]] = None,
+        max_workers: Optional[int] = config.METRIC_WORKERS,
+        chunk_size: int = config.METRIC_CHUNK_SIZE,
+        inline_pairs: int = config.METRIC_INLINE_PAIRS
+    ):
+        """
+        Args:
+            names: Registered metric names (default: config.QUALITY_METRICS)
+            max_workers: Worker processes (default: one per CPU)
+            chunk_size: Most sentence pairs per task; inputs are split into
+                one chunk per worker up to this size
+            inline_pairs: Inputs of at most this many pairs are scored inline
+        """
+        self.names = list(config.QUALITY_METRICS if names is None else names)
+        unknown = [name for name in self.names if name not in METRICS]
+        if unknown:
+            raise ValueError(
+                f"Unknown quality metric(s) {', '.join(unknown)}. "
+                f"Available: {', '.join(METRICS)}"
+            )
+        self.metrics = [METRICS[name] for name in self.names]
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.inline_pairs = inline_pairs
+        self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """
+        Start the worker processes on first use and keep them warm.
+
+        Workers are spawned rather than forked: the pool may be created while
+        other threads (sweep runs, hedge executors, server threads) hold locks
+        that a forked child would inherit in a locked state.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, originals: List[str], finals: List[str]) -> "MetricJob":
+        """
+        Start evaluating sentence pairs without waiting for the result.
+
+        Args:
+            originals: Original sentences
+            finals: Round-trip sentences
+
+        Returns:
+            Job whose result() returns the metric results (see MetricJob)
+        """
+        if len(originals) != len(finals):
+            raise ValueError("Original and final sentence counts differ")
+        if not self.names or len(originals) <= self.inline_pairs:
+            future = Future()
+            future.set_result(_chunk_statistics(self.metrics, originals, finals))
+            return MetricJob(self.metrics, [future])
+
+        # One chunk per worker, so even a small run is spread over the pool
+        chunk_size = min(self.chunk_size, math.ceil(len(originals) / self.max_workers))
+        futures = [
+            self._pool().submit(
+                _chunk_statistics,
+                self.metrics,
+                originals[start:start + chunk_size],
+                finals[start:start + chunk_size]
+            )
+            for start in range(0, len(originals), chunk_size)
+        ]
+        return MetricJob(self.metrics, futures)
+
+    def evaluate(self, originals: List[str], finals: List[str]) -> Dict[str, Dict]:
+        """Evaluate sentence pairs and wait for the result."""
+        return self.submit(originals, finals).result()
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class MetricJob:
+    """Pending metric evaluation of one set of sentence pairs."""
+
+    def __init__(self, metrics: List[Metric], futures: List[Future]):
+        self.metrics = metrics
+        self.futures = futures
+
+    def statistics(self) -> Dict[str, np.ndarray]:
+        """
+        Wait for the chunks and concatenate their statistics.
+
+        Returns:
+            Metric name -> array of shape [sentences, num_statistics]
+        """
+        chunks = [future.result() for future in self.futures]
+        return {
+            metric.name: np.concatenate([chunk[metric.name] for chunk in chunks])
+            for metric in self.metrics
+        }
+
+    def result(self) -> Dict[str, Dict]:
+        """Combine the chunk statistics into scores (see summarize_metrics)."""
+        return summarize_metrics(self.metrics, self.statistics())
+
+
+def summarize_metrics(
+    metrics: Sequence[Metric],
+    statistics: Dict[str, np.ndarray]
+) -> Dict[str, Dict]:
+    """
+    Turn per-sentence statistics into scores.
+
+    Args:
+        metrics: Metrics to summarize
+        statistics: Metric name -> array of shape [sentences, num_statistics]
+
+    Returns:
+        Metric name -> {'label', 'higher_is_better', 'corpus' (score of the
+        summed statistics), 'mean', 'std', 'scores' (per sentence)}
+    """
+    results = {}
+    for metric in metrics:
+        scores = metric.scores(statistics[metric.name])
+        results[metric.name] = {
+            "label": metric.label,
+            "higher_is_better": metric.higher_is_better,
+            "corpus": metric.corpus_score(statistics[metric.name].sum(axis=0)),
+            "mean": float(scores.mean()) if len(scores) else 0.0,
+            "std": float(scores.std()) if len(scores) else 0.0,
+            "scores": [float(score) for score in scores]
+        }
+    return results
@@ -1,48 +1,54 @@
 """
 Orchestrator Agent - Coordinates the multi-agent translation system.
 """
-import json
-from typing import List, Optional
+import math
+import random
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 from pathlib import Path
-from anthropic import Anthropic
+import numpy as np
 
 import config
-from agents import Agent1HebrewToEnglish, Agent2EnglishToFrench, Agent3FrenchToHebrew
+from agents import get_client
+from analysis import analysis_cache_file, save_analysis_cache
+from artifact import pyarrow_available, write_run_artifact
+from metrics import MetricEngine, MetricJob
+from pipeline import (
+    FirstHopPrefetcher,
+    TranslationDAG,
+    chain_key,
+    chain_title,
+    quality_output_files,
+    stage_labels,
+    stage_output_file
+)
 from utils import (
     EmbeddingEngine,
     FileManager,
+    JSONArrayStreamParser,
     Visualizer,
     StatsCalculator,
     print_translation_journey,
     print_file_summary
 )
+from vector_index import DriftIndex, run_identifier, run_key
 
 
-class OrchestratorAgent:
-    """Orchestrator agent that coordinates the translation workflow."""
+class SentenceGenerator:
+    """
+    Generates Hebrew source sentences with the orchestrator prompt.
 
-    def __init__(self):
-        """Initialize orchestrator and translation agents."""
-        self.client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
+    Needs only the API client, so callers that just want a corpus (e.g. a
+    sweep) do not have to build translation agents.
+    """
 
-        # Load orchestrator prompt
+    def __init__(self):
+        self.client = get_client()
         with open(config.ORCHESTRATOR_PROMPT_FILE, 'r', encoding='utf-8') as f:
             self.system_prompt = f.read()
 
-        # Initialize translation agents
-        print("Initializing translation agents...")
-        self.agent1 = Agent1HebrewToEnglish()
-        self.agent2 = Agent2EnglishToFrench()
-        self.agent3 = Agent3FrenchToHebrew()
-        print("All agents initialized.\n")
-
-        # Initialize utilities
-        self.file_manager = FileManager()
-        self.visualizer = Visualizer()
-        self.stats_calculator = StatsCalculator()
-        self.embedding_engine = None  # Lazy load when needed
-
-    def generate_hebrew_sentences(
+    def generate(
         self,
         num_sentences: int,
         topic: Optional[str] = None
@@ -57,6 +63,28 @@ class OrchestratorAgent:
         Returns:
             List of Hebrew sentences
         """
+        sentences = list(self.stream(num_sentences, topic))
+        self.report(sentences, num_sentences)
+        return sentences
+
+    def stream(
+        self,
+        num_sentences: int,
+        topic: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Generate Hebrew sentences, yielding each one as soon as it is complete.
+
+        The response is streamed and parsed incrementally, so callers can start
+        working on the first sentences while the rest are being generated.
+
+        Args:
+            num_sentences: Number of sentences to generate
+            topic: Optional topic/domain for sentences
+
+        Yields:
+            Hebrew sentences, in order
+        """
         print(f"\nGenerating {num_sentences} Hebrew sentences...")
 
         # Validate input
@@ -82,7 +110,8 @@ Respond with ONLY a JSON array of sentences, like this:
 Do not include any other text or explanation."""
 
         try:
-            response = self.client.messages.create(
+            parser = JSONArrayStreamParser()
+            with self.client.messages.stream(
                 model=config.MODEL_NAME,
                 max_tokens=config.MAX_TOKENS,
                 temperature=0.7,  # Higher temperature for creative sentence generation
@@ -90,137 +119,602 @@ Do not include any other text or explanation."""
                 messages=[
                     {"role": "user", "content": user_message}
                 ]
-            )
+            ) as stream:
+                for text in stream.text_stream:
+                    yield from parser.feed(text)
+            parser.close()
 
-            # Extract response
-            response_text = response.content[0].text.strip()
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate sentences: {str(e)}")
 
-            # Parse JSON
-            if response_text.startswith("```"):
-                # Extract JSON from code block
-                lines = response_text.split('\n')
-                json_lines = []
-                in_json = False
-                for line in lines:
-                    if line.strip().startswith("```"):
-                        if in_json:
-                            break
-                        else:
-                            in_json = True
-                            continue
-                    if in_json:
-                        json_lines.append(line)
-                response_text = '\n'.join(json_lines)
+    @staticmethod
+    def report(sentences: List[str], num_sentences: int) -> None:
+        """Print the outcome of sentence generation."""
+        if len(sentences) != num_sentences:
+            print(f"  ⚠ Generated {len(sentences)} sentences instead of {num_sentences}")
+        print(f"✓ Generated {len(sentences)} Hebrew sentences")
 
-            sentences = json.loads(response_text)
 
-            # Validate
-            if not isinstance(sentences, list):
-                raise ValueError("Response is not a list")
+class OrchestratorAgent:
+    """Orchestrator agent that coordinates the translation workflow."""
 
-            if len(sentences) != num_sentences:
-                print(f"  ⚠ Generated {len(sentences)} sentences instead of {num_sentences}")
+    def __init__(
+        self,
+        lean_responses: bool = config.LEAN_RESPONSES,
+        chains: Optional[Sequence[Sequence[str]]] = None,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        output_dir: Optional[Path] = None,
+        embedding_engine: Optional[EmbeddingEngine] = None,
+        metric_engine: Optional[MetricEngine] = None,
+        routing: bool = config.ROUTING_ENABLED,
+        hedging: bool = config.HEDGING_ENABLED,
+        export_text_files: bool = config.EXPORT_TEXT_FILES,
+        store_embeddings: bool = config.STORE_EMBEDDINGS
+    ):
+        """
+        Initialize orchestrator and translation agents.
 
-            print(f"✓ Generated {len(sentences)} Hebrew sentences")
+        Args:
+            lean_responses: Whether agents request the minimal response schema
+            chains: Language chains to run (default: config.LANGUAGE_CHAINS)
+            model: Translation model (default: config.MODEL_NAME)
+            temperature: Translation temperature (default: config.TEMPERATURE)
+            output_dir: Directory for output files (default: config.OUTPUT_DIR)
+            embedding_engine: Already-loaded embedding engine to reuse
+            metric_engine: Surface metric engine (and its process pool) to reuse
+            routing: Whether agents use confidence-driven model routing
+            hedging: Whether agents hedge slow API calls with duplicate requests
+            export_text_files: Also write the legacy per-stage text files
+            store_embeddings: Include embeddings in the run artifact
+        """
+        self.sentence_generator = SentenceGenerator()
+        self.model = model or config.MODEL_NAME
+        self.temperature = config.TEMPERATURE if temperature is None else temperature
+        self.output_dir = Path(output_dir) if output_dir else config.OUTPUT_DIR
+        self.output_dir.mkdir(parents=True, exist_ok=True)
 
-            return sentences
+        # Initialize translation agents
+        print("Initializing translation agents...")
+        self.dag = TranslationDAG(
+            chains or config.LANGUAGE_CHAINS,
+            lean_responses=lean_responses,
+            model=self.model,
+            temperature=self.temperature,
+            routing=routing,
+            hedging=hedging
+        )
+        if self.dag.source_lang != "he":
+            raise ValueError(
+                f"Language chains must start from Hebrew ('he'), got '{self.dag.source_lang}'"
+            )
+        self.lean_responses = lean_responses
+        self.routing = routing
+        self.hedging = hedging
+        self.store_embeddings = store_embeddings
+
+        # The columnar artifact replaces the text files; keep them if it can't be written
+        self.write_artifact = config.WRITE_RUN_ARTIFACT and pyarrow_available()
+        if config.WRITE_RUN_ARTIFACT and not self.write_artifact:
+            print("  ⚠ pyarrow not installed; writing text files instead of the run artifact")
+        self.export_text_files = export_text_files or not self.write_artifact
+        print(f"All agents initialized ({len(self.dag.agents())} stages).\n")
 
-        except Exception as e:
-            raise RuntimeError(f"Failed to generate sentences: {str(e)}")
+        # Initialize utilities
+        self.file_manager = FileManager()
+        self.visualizer = Visualizer()
+        self.stats_calculator = StatsCalculator()
+        self.embedding_engine = embedding_engine  # Lazy load when needed
+        self.metric_engine = metric_engine
+
+    def output_file(self, default_path: Path) -> Path:
+        """Place a standard output file (from config) in this run's output directory."""
+        return self.output_dir / default_path.name
+
+    def generate_hebrew_sentences(
+        self,
+        num_sentences: int,
+        topic: Optional[str] = None
+    ) -> List[str]:
+        """Generate meaningful Hebrew sentences (see SentenceGenerator.generate)."""
+        return self.sentence_generator.generate(num_sentences, topic)
+
+    def stream_hebrew_sentences(
+        self,
+        num_sentences: int,
+        topic: Optional[str] = None
+    ) -> Iterator[str]:
+        """Stream Hebrew sentences as they are generated (see SentenceGenerator.stream)."""
+        return self.sentence_generator.stream(num_sentences, topic)
+
+    def generate_and_prefetch(
+        self,
+        num_sentences: int,
+        topic: Optional[str] = None
+    ) -> Tuple[List[str], Dict[Tuple[str, ...], List[Dict]]]:
+        """
+        Generate sentences while the first-hop agents already translate them.
+
+        Args:
+            num_sentences: Number of sentences to generate
+            topic: Optional topic/domain for sentences
+
+        Returns:
+            Tuple of (Hebrew sentences, first-hop results for TranslationDAG.execute)
+        """
+        prefetcher = FirstHopPrefetcher(self.dag)
+        sentences = []
+        start = time.perf_counter()
+        try:
+            for sentence in self.stream_hebrew_sentences(num_sentences, topic):
+                if not sentences:
+                    print(f"  First sentence after {time.perf_counter() - start:.1f}s; "
+                          f"translation started")
+                sentences.append(sentence)
+                prefetcher.submit(sentence)
+        finally:
+            precomputed = prefetcher.results()
+
+        SentenceGenerator.report(sentences, num_sentences)
+        return sentences, precomputed
 
     def run_translation_pipeline(
         self,
-        hebrew_original: List[str]
-    ) -> tuple[List[str], List[str], List[str]]:
+        hebrew_original: List[str],
+        precomputed: Optional[Dict[Tuple[str, ...], List[Dict]]] = None
+    ) -> Dict[Tuple[str, ...], List[str]]:
         """
-        Run the translation pipeline through all 3 agents.
+        Run the translation pipeline through every stage of the language DAG.
 
         Args:
             hebrew_original: Original Hebrew sentences
+            precomputed: First-hop results from generate_and_prefetch
 
         Returns:
-            Tuple of (english, french, hebrew_final) translations
+            Dictionary mapping each stage path (e.g. ('he', 'en')) to its sentences
         """
         print("\n" + "="*60)
         print("STARTING TRANSLATION PIPELINE")
         print("="*60)
 
-        # Agent 1: Hebrew → English
-        english = self.agent1.batch_translate(hebrew_original)
-        self.file_manager.save_sentences(english, config.SENTENCES_ENGLISH)
+        stages = self.dag.execute(hebrew_original, precomputed)
 
-        # Agent 2: English → French
-        french = self.agent2.batch_translate(english)
-        self.file_manager.save_sentences(french, config.SENTENCES_FRENCH)
-
-        # Agent 3: French → Hebrew
-        hebrew_final = self.agent3.batch_translate(french)
-        self.file_manager.save_sentences(hebrew_final, config.SENTENCES_HEBREW_FINAL)
+        # Save every translated stage once, including shared prefixes
+        if self.export_text_files:
+            for path, sentences in stages.items():
+                if len(path) > 1:
+                    self.file_manager.save_sentences(sentences, stage_output_file(path, self.output_dir))
 
         print("\n✓ Translation pipeline completed")
 
-        return english, french, hebrew_final
+        # Record per-agent latency and output token usage
+        self.file_manager.save_metrics(
+            self.collect_performance(),
+            self.output_file(config.PERFORMANCE_METRICS_FILE)
+        )
+
+        return stages
+
+    def collect_performance(self) -> dict:
+        """
+        Collect latency and output token statistics from the last batch of each agent.
+
+        Returns:
+            Dictionary with per-agent stats and pipeline totals
+        """
+        agents = [
+            agent.last_batch_stats
+            for agent in self.dag.agents()
+            if agent.last_batch_stats
+        ]
+        sentences = agents[0]["sentences"] if agents else 0
+
+        return {
+            "model": self.model,
+            "temperature": self.temperature,
+            "response_mode": "lean" if self.lean_responses else "full",
+            "routing": self.routing,
+            "hedging": self.hedging,
+            "agents": agents,
+            "output_tokens_per_sentence": sum(
+                a.get("output_tokens_per_sentence", 0.0) for a in agents
+            ),
+            "latency_per_sentence_s": (
+                sum(a["wall_time_s"] for a in agents) / sentences if sentences else 0.0
+            ),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def translate_and_score(
+        self,
+        sentences: List[str],
+        round_trip: bool = True
+    ) -> dict:
+        """
+        Translate sentences through the DAG and score round-trip chains, without writing files.
+
+        Used for shards handed out by the work queue.
+
+        Args:
+            sentences: Hebrew sentences
+            round_trip: Whether to compute round-trip distances
+
+        Returns:
+            JSON-serializable dictionary with 'stages', 'confidences' and
+            'distances', each keyed by chain_key
+        """
+        stages = self.dag.execute(sentences)
+        confidences = self.dag.last_confidences
+
+        distances = {}
+        if round_trip and self.dag.round_trip_chains:
+            embedding_engine = self.get_embedding_engine()
+            original_embeddings = embedding_engine.encode(sentences)
+            for chain in self.dag.round_trip_chains:
+                distances[chain_key(chain)] = embedding_engine.calculate_cosine_distances(
+                    original_embeddings,
+                    embedding_engine.encode_round_trip(stages[chain], sentences, original_embeddings)
+                )
+
+        return {
+            "stages": {chain_key(path): texts for path, texts in stages.items()},
+            "confidences": {chain_key(path): values for path, values in confidences.items()},
+            "distances": distances
+        }
+
+    def save_run_artifact(
+        self,
+        stages: Dict[Tuple[str, ...], List[str]],
+        confidences: Dict[Tuple[str, ...], List[float]],
+        distances: Optional[Dict[Tuple[str, ...], List[float]]] = None,
+        embeddings: Optional[Dict[Tuple[str, ...], np.ndarray]] = None,
+        sentence_ids: Optional[List[int]] = None,
+        **metadata
+    ) -> None:
+        """
+        Write (or overwrite) the run artifact.
+
+        Called as soon as translations exist, so a failure while scoring
+        does not lose them, and again once distances are known.
+
+        Args:
+            stages: Stage path -> sentences
+            confidences: Stage path -> per-sentence agent confidence
+            distances: Optional round-trip chain -> per-sentence distance
+            embeddings: Optional stage path -> embedding matrix
+            sentence_ids: 1-based corpus ids of the rows (default: 1..N)
+            **metadata: Extra run metadata (e.g. topic)
+        """
+        write_run_artifact(
+            self.output_file(config.RUN_ARTIFACT_FILE),
+            stages,
+            confidences=confidences,
+            distances=distances,
+            embeddings=embeddings if self.store_embeddings else None,
+            metadata={
+                "model": self.model,
+                "temperature": self.temperature,
+                "chains": [chain_key(chain) for chain in self.dag.chains],
+                **metadata
+            },
+            sentence_ids=sentence_ids
+        )
+
+    def get_embedding_engine(self) -> EmbeddingEngine:
+        """Lazy load the embedding engine."""
+        if self.embedding_engine is None:
+            self.embedding_engine = EmbeddingEngine()
+        return self.embedding_engine
+
+    def get_metric_engine(self) -> MetricEngine:
+        """Lazy create the surface metric engine."""
+        if self.metric_engine is None:
+            self.metric_engine = MetricEngine()
+        return self.metric_engine
 
     def analyze_quality(
         self,
         hebrew_original: List[str],
-        hebrew_final: List[str]
+        hebrew_final: List[str],
+        original_embeddings: Optional[np.ndarray] = None,
+        chain: Sequence[str] = config.DEFAULT_CHAIN,
+        final_embeddings: Optional[np.ndarray] = None,
+        metric_job: Optional[MetricJob] = None
     ) -> dict:
         """
-        Analyze translation quality using cosine distance.
+        Analyze translation quality using cosine distance and surface metrics.
 
         Args:
             hebrew_original: Original Hebrew sentences
             hebrew_final: Final Hebrew sentences after round-trip
+            original_embeddings: Precomputed embeddings of the originals, shared
+                across branches so they are encoded only once
+            chain: Round-trip chain that produced hebrew_final
+            final_embeddings: Precomputed embeddings of the final sentences
+            metric_job: Surface metrics already submitted for these sentences
 
         Returns:
             Dictionary with quality metrics
         """
         print("\n" + "="*60)
-        print("STARTING QUALITY ANALYSIS")
+        print(f"STARTING QUALITY ANALYSIS ({chain_title(chain)})")
         print("="*60)
 
-        # Lazy load embedding engine
-        if self.embedding_engine is None:
-            self.embedding_engine = EmbeddingEngine()
+        embedding_engine = self.get_embedding_engine()
 
-        # Vectorize sentences
-        print("\nVectorizing original Hebrew sentences...")
-        original_embeddings = self.embedding_engine.encode(hebrew_original)
+        # Surface metrics are computed in worker processes while we embed
+        if metric_job is None:
+            metric_job = self.get_metric_engine().submit(hebrew_original, hebrew_final)
 
-        print("Vectorizing final Hebrew sentences...")
-        final_embeddings = self.embedding_engine.encode(hebrew_final)
+        # Vectorize sentences
+        if original_embeddings is None:
+            print("\nVectorizing original Hebrew sentences...")
+            original_embeddings = embedding_engine.encode(hebrew_original)
+
+        if final_embeddings is None:
+            print("Vectorizing final Hebrew sentences...")
+            final_embeddings = embedding_engine.encode_round_trip(
+                hebrew_final, hebrew_original, original_embeddings
+            )
 
         # Calculate cosine distances
         print("\nCalculating cosine distances...")
-        distances = self.embedding_engine.calculate_cosine_distances(
+        distances = embedding_engine.calculate_cosine_distances(
             original_embeddings,
             final_embeddings
         )
 
         # Calculate statistics
         stats = self.stats_calculator.calculate_statistics(distances)
+        stats["chain"] = list(chain)
+        stats["metrics"] = metric_job.result()
 
-        # Save metrics
-        self.file_manager.save_metrics(stats)
+        self.save_quality_report(stats, chain)
 
-        # Generate graph
-        print("\nGenerating quality graph...")
-        self.visualizer.plot_quality_graph(
+        # Seed the offline analyzer so `main.py analyze` only re-scores edits
+        save_analysis_cache(
+            analysis_cache_file(chain, self.output_dir),
+            hebrew_original,
+            hebrew_final,
             distances,
-            stats['mean_distance']
+            metric_job.statistics()
         )
 
         print("\n✓ Quality analysis completed")
 
         return stats
 
+    def update_drift_index(
+        self,
+        hebrew_original: List[str],
+        stages: Dict[Tuple[str, ...], List[str]],
+        embeddings: Dict[Tuple[str, ...], np.ndarray],
+        branch_stats: Dict[Tuple[str, ...], dict]
+    ) -> None:
+        """
+        Add the analyzed round trips of this run to the cross-run drift index,
+        replacing earlier blocks of the same output directory and chain.
+
+        Args:
+            hebrew_original: Original Hebrew sentences
+            stages: Stage path -> sentences
+            embeddings: Stage path -> embeddings (root path and round-trip chains)
+            branch_stats: Round-trip chain -> statistics with 'distances'
+        """
+        index = DriftIndex()
+        for chain, stats in branch_stats.items():
+            index.add(
+                run_identifier(self.output_dir, chain),
+                chain,
+                hebrew_original,
+                stages[chain],
+                embeddings[self.dag.root.path],
+                embeddings[chain],
+                stats['distances'],
+                key=run_key(self.output_dir, chain)
+            )
+
+    def save_quality_report(self, stats: dict, chain: Sequence[str]) -> None:
+        """
+        Save the metrics file and quality graph of a round-trip chain.
+
+        Args:
+            stats: Statistics dictionary (with 'distances' and 'mean_distance')
+            chain: Round-trip chain the statistics belong to
+        """
+        metrics_path, graph_path = quality_output_files(chain, self.output_dir)
+        self.file_manager.save_metrics(stats, metrics_path)
+
+        print("\nGenerating quality graph...")
+        self.visualizer.plot_quality_graph(
+            stats['distances'],
+            stats['mean_distance'],
+            graph_path,
+            chain_title(chain),
+            metrics=stats.get("metrics")
+        )
+
+    def round_call_bound(self, num_sentences: int) -> int:
+        """Worst-case API requests of translating num_sentences through the DAG."""
+        return sum(agent.max_calls(num_sentences) for agent in self.dag.agents())
+
+    def check_sampling_budget(self, max_api_calls: Optional[int]) -> None:
+        """
+        Check that an API call budget can pay for a confidence interval.
+
+        Args:
+            max_api_calls: Budget of translation API calls (None = unlimited)
+
+        Raises:
+            ValueError: If the budget cannot cover two sentences, the minimum
+                a confidence interval needs, in the worst case
+        """
+        if max_api_calls is None:
+            return
+        if max_api_calls < 1:
+            raise ValueError("API call budget must be at least 1")
+        needed = self.round_call_bound(2)
+        if max_api_calls < needed:
+            raise ValueError(
+                f"API call budget {max_api_calls} is too small: a confidence interval "
+                f"needs at least 2 sentences, which can take up to {needed} calls "
+                f"through {len(self.dag.agents())} translation hops"
+            )
+
+    def estimate_quality(
+        self,
+        hebrew_original: List[str],
+        target_width: float = config.SAMPLING_TARGET_WIDTH,
+        max_api_calls: Optional[int] = config.SAMPLING_MAX_API_CALLS,
+        round_size: int = config.SAMPLING_ROUND_SIZE,
+        confidence: float = config.SAMPLING_CONFIDENCE,
+        seed: Optional[int] = None
+    ) -> Dict[Tuple[str, ...], dict]:
+        """
+        Estimate mean round-trip distance by sequential random sampling.
+
+        Translates and scores random rounds of sentences, keeping a running
+        confidence interval per round-trip chain, and stops once every
+        interval is narrower than target_width, the API call budget is spent
+        or the corpus is exhausted.
+
+        Args:
+            hebrew_original: Full Hebrew corpus to sample from
+            target_width: Stop when the CI (high - low) is at most this wide
+            max_api_calls: Optional budget of translation API calls
+            round_size: Sentences per sampling round
+            confidence: Confidence level of the interval
+            seed: Optional random seed for a reproducible sample
+
+        Returns:
+            Dictionary mapping each round-trip chain to its statistics
+        """
+        print("\n" + "="*60)
+        print("STARTING SEQUENTIAL SAMPLING QUALITY ESTIMATION")
+        print("="*60)
+
+        chains = self.dag.round_trip_chains
+        if not chains:
+            raise ValueError("Sequential sampling needs at least one round-trip chain")
+
+        calls_per_sentence = len(self.dag.agents())
+        self.check_sampling_budget(max_api_calls)
+        if not hebrew_original:
+            raise ValueError("Sequential sampling needs a non-empty corpus")
+
+        order = list(range(len(hebrew_original)))
+        random.Random(seed).shuffle(order)
+        embedding_engine = self.get_embedding_engine()
+
+        sampled = []
+        sampled_stages = {}
+        sampled_confidences = {}
+        distances = {chain: [] for chain in chains}
+        intervals = {}
+        api_calls = 0
+        rounds = 0
+        stop_reason = "corpus exhausted"
+
+        while len(sampled) < len(order):
+            size = min(round_size, len(order) - len(sampled))
+            if max_api_calls is not None:
+                # Shrink the round until even its worst case (every escalation,
+                # truncation retry and hedge) fits in what is left of the budget
+                while size > 0 and self.round_call_bound(size) > max_api_calls - api_calls:
+                    size -= 1
+            if size <= 0:
+                stop_reason = "budget reached"
+                break
+
+            batch_ids = order[len(sampled):len(sampled) + size]
+            batch = [hebrew_original[i] for i in batch_ids]
+
+            stages = self.dag.execute(batch)
+            # Each agent's call_log holds this batch's answered calls; hedges
+            # are extra requests on top of them
+            api_calls += sum(
+                len([c for c in agent.call_log if not c.get("hedge_loser")]) + agent.hedges_fired
+                for agent in self.dag.agents()
+            )
+            sampled += batch_ids
+            rounds += 1
+
+            # Keep the sampled translations in the artifact from the first round on
+            for path, texts in stages.items():
+                sampled_stages.setdefault(path, []).extend(texts)
+            for path, values in self.dag.last_confidences.items():
+                sampled_confidences.setdefault(path, []).extend(values)
+            if self.write_artifact:
+                self.save_run_artifact(
+                    sampled_stages, sampled_confidences,
+                    sentence_ids=[i + 1 for i in sampled], sampled=True
+                )
+
+            original_embeddings = embedding_engine.encode(batch)
+            for chain in chains:
+                distances[chain] += embedding_engine.calculate_cosine_distances(
+                    original_embeddings,
+                    embedding_engine.encode_round_trip(stages[chain], batch, original_embeddings)
+                )
+                intervals[chain] = self.stats_calculator.confidence_interval(
+                    distances[chain], confidence
+                )
+
+            widest = max(high - low for _, low, high in intervals.values())
+            print(f"\nRound {rounds}: {len(sampled)}/{len(order)} sentences, "
+                  f"{api_calls} API calls, widest CI {widest:.4f} (target {target_width})")
+
+            if len(sampled) >= config.SAMPLING_MIN_SAMPLES and widest <= target_width:
+                stop_reason = "target width reached"
+                break
+
+        if not sampled:
+            raise ValueError("The API call budget did not allow sampling any sentence")
+
+        if self.write_artifact:
+            self.save_run_artifact(
+                sampled_stages, sampled_confidences,
+                distances=distances,
+                sentence_ids=[i + 1 for i in sampled], sampled=True
+            )
+
+        results = {}
+        for chain in chains:
+            mean, low, high = intervals[chain]
+            # The interval is unbounded below two samples; JSON has no Infinity
+            if not math.isfinite(high - low):
+                low = high = None
+            stats = self.stats_calculator.calculate_statistics(distances[chain])
+            stats["chain"] = list(chain)
+            stats["sentence_ids"] = [i + 1 for i in sampled]
+            stats["sampling"] = {
+                "corpus_size": len(hebrew_original),
+                "confidence": confidence,
+                "ci_low": low,
+                "ci_high": high,
+                "ci_width": None if low is None else high - low,
+                "target_width": target_width,
+                "rounds": rounds,
+                "api_calls": api_calls,
+                "api_calls_full_run": len(hebrew_original) * calls_per_sentence,
+                "stop_reason": stop_reason
+            }
+            self.save_quality_report(stats, chain)
+            results[chain] = stats
+
+        print(f"\n✓ Sampling completed: {len(sampled)} of {len(order)} sentences, "
+              f"{api_calls} API calls ({stop_reason})")
+
+        return results
+
     def run(
         self,
         num_sentences: int,
         round_trip: bool = True,
-        topic: Optional[str] = None
-    ) -> None:
+        topic: Optional[str] = None,
+        hebrew_original: Optional[List[str]] = None,
+        sampling: Optional[dict] = None
+    ) -> dict:
         """
         Main orchestration method.
 
@@ -228,62 +722,176 @@ Do not include any other text or explanation."""
             num_sentences: Number of sentences to generate
             round_trip: Whether to perform round-trip quality analysis
             topic: Optional topic for sentence generation
+            hebrew_original: Pre-generated Hebrew sentences to use instead of
+                generating new ones (e.g. a corpus shared by a sweep)
+            sampling: If given, estimate quality by sequential sampling
+                instead of translating every sentence; holds keyword
+                arguments for estimate_quality (may be empty)
+
+        Returns:
+            Run summary with per-chain statistics and performance
         """
         print("\n" + "="*60)
         print("MULTI-AGENT TRANSLATION SYSTEM")
         print("="*60)
         print(f"Configuration:")
-        print(f"  - Sentences: {num_sentences}")
-        print(f"  - Round-trip analysis: {round_trip}")
+        print(f"  - Sentences: {len(hebrew_original) if hebrew_original else num_sentences}")
+        print(f"  - Round-trip analysis: {'sequential sampling' if sampling is not None else round_trip}")
         print(f"  - Topic: {topic if topic else 'Mixed'}")
-        print(f"  - Model: {config.MODEL_NAME}")
+        print(f"  - Model: {self.model}")
+        print(f"  - Temperature: {self.temperature}")
+        print(f"  - Response mode: {'lean' if self.lean_responses else 'full'}")
+        print(f"  - Hedged requests: {'on' if self.hedging else 'off'}")
+        print(f"  - Model routing: {'tiered (' + config.FAST_MODEL_NAME + ' first)' if self.routing else 'off'}")
+        print(f"  - Chains: {', '.join(chain_title(c) for c in self.dag.chains)}")
         print("="*60)
 
-        # Step 1: Generate Hebrew sentences
-        hebrew_original = self.generate_hebrew_sentences(num_sentences, topic)
-        self.file_manager.save_sentences(hebrew_original, config.SENTENCES_HEBREW_ORIGINAL)
+        # Fail on a budget too small to sample before paying for generation
+        if sampling is not None:
+            self.check_sampling_budget(sampling.get("max_api_calls"))
+
+        # Step 1: Generate Hebrew sentences (streamed into the first hops)
+        precomputed = None
+        if hebrew_original is None:
+            if config.STREAM_GENERATION and sampling is None:
+                hebrew_original, precomputed = self.generate_and_prefetch(num_sentences, topic)
+            else:
+                hebrew_original = self.generate_hebrew_sentences(num_sentences, topic)
+        original_file = self.output_file(config.SENTENCES_HEBREW_ORIGINAL)
+        if self.export_text_files:
+            self.file_manager.save_sentences(hebrew_original, original_file)
+
+        # Sampling mode: translate and score random rounds until the CI is tight
+        if sampling is not None:
+            branch_stats = self.estimate_quality(hebrew_original, **sampling)
+            for stats in branch_stats.values():
+                self.stats_calculator.print_statistics(stats)
+
+            files = [original_file] if self.export_text_files else []
+            if self.write_artifact:
+                files.append(self.output_file(config.RUN_ARTIFACT_FILE))
+            for chain in branch_stats:
+                files += list(quality_output_files(chain, self.output_dir))
+            print_file_summary(files)
+
+            return {
+                "output_dir": str(self.output_dir),
+                "num_sentences": len(hebrew_original),
+                "chains": {
+                    chain_key(chain): {
+                        key: value for key, value in stats.items()
+                        if key not in ("distances", "sentence_ids")
+                    }
+                    for chain, stats in branch_stats.items()
+                }
+            }
 
         # Step 2: Run translation pipeline
-        english, french, hebrew_final = self.run_translation_pipeline(hebrew_original)
-
-        # Step 3: Quality analysis (if enabled)
-        stats = None
-        if round_trip:
-            stats = self.analyze_quality(hebrew_original, hebrew_final)
+        stages = self.run_translation_pipeline(hebrew_original, precomputed)
+        confidences = self.dag.last_confidences
+
+        # Single columnar artifact with every stage and confidence, written
+        # before scoring so the paid-for translations survive a later failure
+        if self.write_artifact:
+            self.save_run_artifact(stages, confidences, topic=topic)
+
+        # Step 3: Quality analysis per round-trip branch (if enabled)
+        branch_stats = {}
+        embeddings = {}
+        if round_trip and self.dag.round_trip_chains:
+            metric_jobs = {
+                chain: self.get_metric_engine().submit(hebrew_original, stages[chain])
+                for chain in self.dag.round_trip_chains
+            }
+            print("\nVectorizing original Hebrew sentences (shared by all branches)...")
+            original_embeddings = self.get_embedding_engine().encode(hebrew_original)
+            embeddings[self.dag.root.path] = original_embeddings
+            for chain in self.dag.round_trip_chains:
+                embeddings[chain] = self.get_embedding_engine().encode_round_trip(
+                    stages[chain], hebrew_original, original_embeddings
+                )
+                branch_stats[chain] = self.analyze_quality(
+                    hebrew_original,
+                    stages[chain],
+                    original_embeddings=original_embeddings,
+                    chain=chain,
+                    final_embeddings=embeddings[chain],
+                    metric_job=metric_jobs[chain]
+                )
+
+        if branch_stats and config.UPDATE_DRIFT_INDEX:
+            self.update_drift_index(hebrew_original, stages, embeddings, branch_stats)
+
+        # Add distances (and embeddings) to the artifact
+        if self.write_artifact and branch_stats:
+            self.save_run_artifact(
+                stages,
+                confidences,
+                distances={chain: stats['distances'] for chain, stats in branch_stats.items()},
+                embeddings=embeddings,
+                topic=topic
+            )
 
         # Step 4: Present results
         print("\n" + "="*60)
         print("RESULTS")
         print("="*60)
 
-        # Print sample translations
-        print_translation_journey(
-            hebrew_original,
-            english,
-            french,
-            hebrew_final,
-            stats['distances'] if stats else None,
-            max_display=5
-        )
+        for chain in self.dag.chains:
+            stats = branch_stats.get(chain)
 
-        # Print statistics
-        if stats:
-            self.stats_calculator.print_statistics(stats)
+            # Print sample translations
+            print(f"\nChain: {chain_title(chain)}")
+            print_translation_journey(
+                [(label, stages[chain[:depth + 1]])
+                 for depth, label in enumerate(stage_labels(chain))],
+                stats['distances'] if stats else None,
+                max_display=5
+            )
+
+            # Print statistics
+            if stats:
+                self.stats_calculator.print_statistics(stats)
+        performance = self.collect_performance()
+        self.stats_calculator.print_performance(performance)
+
+        # Collect generated files
+        files = []
+        if self.write_artifact:
+            files.append(self.output_file(config.RUN_ARTIFACT_FILE))
+        if self.export_text_files:
+            files.append(original_file)
+            files += [stage_output_file(path, self.output_dir) for path in stages if len(path) > 1]
+        for chain in branch_stats:
+            files += list(quality_output_files(chain, self.output_dir))
+        files.append(self.output_file(config.PERFORMANCE_METRICS_FILE))
 
         # Print file summary
-        print_file_summary()
+        print_file_summary(files)
 
         # Final message
         print("\n" + "="*60)
         print("SYSTEM COMPLETED SUCCESSFULLY")
         print("="*60)
-        print(f"\nAll output files are saved in: {config.OUTPUT_DIR}")
+        print(f"\nAll output files are saved in: {self.output_dir}")
         print("\nFiles generated:")
-        print(f"  1. {config.SENTENCES_HEBREW_ORIGINAL.name} - Original Hebrew")
-        print(f"  2. {config.SENTENCES_ENGLISH.name} - English translations")
-        print(f"  3. {config.SENTENCES_FRENCH.name} - French translations")
-        print(f"  4. {config.SENTENCES_HEBREW_FINAL.name} - Final Hebrew (round-trip)")
-        if round_trip:
-            print(f"  5. {config.QUALITY_METRICS_FILE.name} - Quality metrics (JSON)")
-            print(f"  6. {config.QUALITY_GRAPH_FILE.name} - Quality visualization (PNG)")
+        for i, filepath in enumerate(files, 1):
+            print(f"  {i}. {filepath.name}")
         print("="*60 + "\n")
+
+        return {
+            "output_dir": str(self.output_dir),
+            "num_sentences": len(hebrew_original),
+            "chains": {
+                chain_key(chain): {
+                    **{key: value for key, value in stats.items()
+                       if key not in ("distances", "metrics")},
+                    # Corpus scores only; per-sentence scores stay in the metrics file
+                    "metrics": {
+                        name: result["corpus"] for name, result in stats["metrics"].items()
+                    }
+                }
+                for chain, stats in branch_stats.items()
+            },
+            "performance": performance
+        }
@@ -0,0 +1,330 @@
+"""
+Language-chain DAG execution.
+
+Chains such as he→en→fr→he and he→en→es→he are merged into a prefix tree of
+translation hops, so shared stages are translated once and independent
+branches run concurrently.
+"""
+import math
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import config
+from agents import TranslationAgent, create_agent
+
+
+def chain_key(path: Sequence[str]) -> str:
+    """Short identifier of a language path, e.g. 'he-en-fr-he'."""
+    return "-".join(path)
+
+
+def chain_title(path: Sequence[str]) -> str:
+    """Readable language path, e.g. 'Hebrew → English → French → Hebrew'."""
+    return " → ".join(config.LANGUAGE_NAMES.get(code, code) for code in path)
+
+
+def stage_output_file(path: Sequence[str], output_dir: Optional[Path] = None) -> Path:
+    """
+    Get the output file for a stage of the DAG.
+
+    Args:
+        path: Language path ending at the stage
+        output_dir: Directory to place the file in (default: config.OUTPUT_DIR)
+
+    Returns:
+        Path of the stage's sentence file
+    """
+    legacy = config.LEGACY_STAGE_FILES.get(tuple(path))
+    name = legacy.name if legacy else f"sentences_{chain_key(path)}.txt"
+    return (output_dir or config.OUTPUT_DIR) / name
+
+
+def quality_output_files(
+    chain: Sequence[str],
+    output_dir: Optional[Path] = None
+) -> Tuple[Path, Path]:
+    """
+    Get the metrics and graph files for a round-trip chain.
+
+    Args:
+        chain: Round-trip language chain
+        output_dir: Directory to place the files in (default: config.OUTPUT_DIR)
+
+    Returns:
+        Tuple of (metrics_path, graph_path)
+    """
+    output_dir = output_dir or config.OUTPUT_DIR
+    metrics_file = config.QUALITY_METRICS_FILE
+    graph_file = config.QUALITY_GRAPH_FILE
+    if tuple(chain) == config.DEFAULT_CHAIN:
+        return output_dir / metrics_file.name, output_dir / graph_file.name
+
+    key = chain_key(chain)
+    return (
+        output_dir / f"{metrics_file.stem}_{key}{metrics_file.suffix}",
+        output_dir / f"{graph_file.stem}_{key}{graph_file.suffix}"
+    )
+
+
+def stage_labels(path: Sequence[str]) -> List[str]:
+    """
+    Journey labels for each stage of a chain, e.g. 'Original (HE)', 'Final (HE)'.
+
+    Args:
+        path: Language chain
+
+    Returns:
+        One label per language in the chain
+    """
+    labels = []
+    for depth, code in enumerate(path):
+        if depth == 0:
+            name = "Original"
+        elif depth == len(path) - 1 and code == path[0]:
+            name = "Final"
+        else:
+            name = config.LANGUAGE_NAMES.get(code, code)
+        labels.append(f"{name} ({code.upper()})")
+    return labels
+
+
+def parse_chain(spec: str) -> Tuple[str, ...]:
+    """
+    Parse a chain specification like 'he,en,fr,he' or 'he-en-fr-he'.
+
+    Args:
+        spec: Comma- or dash-separated language codes
+
+    Returns:
+        Tuple of language codes
+    """
+    codes = [code.strip() for code in spec.replace("-", ",").split(",") if code.strip()]
+    return tuple(codes)
+
+
+def validate_chains(chains: Sequence[Sequence[str]]) -> None:
+    """
+    Check that chains are non-empty, share a source, use known languages
+    and have real hops, without building any agent.
+
+    Args:
+        chains: Language chains
+
+    Raises:
+        ValueError: On the first invalid chain
+    """
+    chains = [tuple(chain) for chain in chains]
+    if not chains:
+        raise ValueError("At least one language chain is required")
+
+    source = chains[0][0] if chains[0] else None
+    for chain in chains:
+        if len(chain) < 2:
+            raise ValueError(f"Chain {chain_key(chain)} needs at least one hop")
+        if chain[0] != source:
+            raise ValueError(
+                f"All chains must start from the same language "
+                f"('{source}'), got {chain_key(chain)}"
+            )
+        for code in chain:
+            if code not in config.LANGUAGE_NAMES:
+                raise ValueError(
+                    f"Unknown language code '{code}'. "
+                    f"Supported: {', '.join(sorted(config.LANGUAGE_NAMES))}"
+                )
+        for src, tgt in zip(chain, chain[1:]):
+            if src == tgt:
+                raise ValueError(f"Chain {chain_key(chain)} has a no-op hop {src}→{tgt}")
+
+
+class ChainNode:
+    """A stage in the DAG: the hop into `path[-1]` and its successors."""
+
+    def __init__(self, path: Tuple[str, ...], agent: Optional[TranslationAgent]):
+        self.path = path
+        self.agent = agent  # None for the root (source sentences)
+        self.children: List["ChainNode"] = []
+
+
+class TranslationDAG:
+    """Prefix tree of translation hops built from declarative chains."""
+
+    def __init__(self, chains: Sequence[Sequence[str]], **agent_kwargs):
+        """
+        Build the DAG and one agent per stage.
+
+        Args:
+            chains: Language chains, all starting from the same language
+            **agent_kwargs: Options passed to every TranslationAgent
+        """
+        self.chains = [tuple(chain) for chain in chains]
+        validate_chains(self.chains)
+
+        self.root = ChainNode(self.chains[0][:1], None)
+        nodes = {self.root.path: self.root}
+        for chain in self.chains:
+            for depth in range(2, len(chain) + 1):
+                path = chain[:depth]
+                if path not in nodes:
+                    node = ChainNode(path, create_agent(path[-2], path[-1], **agent_kwargs))
+                    nodes[path[:-1]].children.append(node)
+                    nodes[path] = node
+        self.nodes = nodes
+
+        # Per-hop agent confidence of the last execute() call
+        self.last_confidences: Dict[Tuple[str, ...], List[float]] = {}
+
+    @property
+    def source_lang(self) -> str:
+        """Language of the input sentences."""
+        return self.root.path[0]
+
+    @property
+    def round_trip_chains(self) -> List[Tuple[str, ...]]:
+        """Chains that return to the source language."""
+        return [chain for chain in self.chains if chain[-1] == chain[0]]
+
+    def agents(self) -> List[TranslationAgent]:
+        """All stage agents, in DAG order."""
+        return [node.agent for node in self.nodes.values() if node.agent is not None]
+
+    def execute(
+        self,
+        sentences: List[str],
+        precomputed: Optional[Dict[Tuple[str, ...], List[Dict]]] = None
+    ) -> Dict[Tuple[str, ...], List[str]]:
+        """
+        Translate sentences through every stage of the DAG.
+
+        Args:
+            sentences: Source-language sentences
+            precomputed: Stage path -> translate() results already obtained
+                (see FirstHopPrefetcher)
+
+        Returns:
+            Dictionary mapping each stage path to its sentences
+        """
+        results = {self.root.path: sentences}
+        self.last_confidences = {}
+        self._run_children(self.root, sentences, results, precomputed or {})
+        return results
+
+    def _run_children(
+        self,
+        node: ChainNode,
+        inputs: List[str],
+        results: Dict[Tuple[str, ...], List[str]],
+        precomputed: Dict[Tuple[str, ...], List[Dict]]
+    ) -> None:
+        """Run all child stages of a node, concurrently when it branches."""
+        if len(node.children) == 1:
+            self._run_node(node.children[0], inputs, results, precomputed)
+            return
+
+        with ThreadPoolExecutor(max_workers=len(node.children) or 1) as executor:
+            futures = [
+                executor.submit(self._run_node, child, inputs, results, precomputed)
+                for child in node.children
+            ]
+            for future in futures:
+                future.result()
+
+    def _run_node(
+        self,
+        node: ChainNode,
+        inputs: List[str],
+        results: Dict[Tuple[str, ...], List[str]],
+        precomputed: Dict[Tuple[str, ...], List[Dict]]
+    ) -> None:
+        """Translate a stage and continue into its subtree."""
+        outputs = node.agent.batch_translate(inputs, precomputed=precomputed.get(node.path))
+        results[node.path] = outputs
+        self.last_confidences[node.path] = [
+            float(result.get("confidence", 0.0)) for result in node.agent.last_results
+        ]
+        self._run_children(node, outputs, results, precomputed)
+
+
+class FirstHopPrefetcher:
+    """
+    Translates sentences on the DAG's first hops as soon as they arrive.
+
+    Each first-hop agent translates up to its max_concurrency sentences at
+    once, just as batch_translate would, but without waiting for the full
+    input. Repeated sentences reuse the first occurrence's translation. With
+    routing, only the first (fast) tier runs here; escalations happen in
+    execute(). The hedge budget grows with the unique sentences submitted,
+    and the time from the first submission to the last translation is left
+    in the agent's prefetch_wall_time_s for its batch stats.
+    """
+
+    def __init__(self, dag: TranslationDAG):
+        """
+        Args:
+            dag: DAG whose root children are fed
+        """
+        self.nodes = dag.root.children
+        self.executors = {}
+        self.futures: Dict[Tuple[str, ...], List[Future]] = {}
+        self.seen: Dict[str, int] = {}  # Sentence -> first row
+        self.started: Optional[float] = None
+        self.finished: Dict[Tuple[str, ...], float] = {}
+        for node in self.nodes:
+            agent = node.agent
+            agent.call_log = []
+            with agent._hedge_lock:
+                agent.hedge_budget = 0
+                agent.hedges_fired = 0
+                agent.hedges_won = 0
+            self.executors[node.path] = ThreadPoolExecutor(
+                max_workers=max(1, agent.max_concurrency)
+            )
+            self.futures[node.path] = []
+
+    def submit(self, sentence: str) -> None:
+        """Queue a newly arrived sentence on every first hop."""
+        if self.started is None:
+            self.started = time.perf_counter()
+        row = len(self.futures[self.nodes[0].path]) if self.nodes else 0
+        first_row = self.seen.setdefault(sentence, row)
+        for node in self.nodes:
+            futures = self.futures[node.path]
+            if first_row != row:
+                futures.append(futures[first_row])
+                continue
+            agent = node.agent
+            # Same cap as batch_translate, over the unique sentences so far
+            with agent._hedge_lock:
+                agent.hedge_budget = math.ceil(config.HEDGE_MAX_FRACTION * len(self.seen))
+            future = self.executors[node.path].submit(
+                agent.translate,
+                sentence_id=len(futures) + 1,
+                text=sentence,
+                model=agent.model_tiers[0] if agent.routing else None
+            )
+            future.add_done_callback(lambda _, path=node.path: self._mark_finished(path))
+            futures.append(future)
+
+    def _mark_finished(self, path: Tuple[str, ...]) -> None:
+        """Record when a hop's latest translation completed (any order)."""
+        now = time.perf_counter()
+        self.finished[path] = max(self.finished.get(path, now), now)
+
+    def results(self) -> Dict[Tuple[str, ...], List[Dict]]:
+        """
+        Wait for the queued translations.
+
+        Returns:
+            First-hop path -> translate() results, for TranslationDAG.execute
+        """
+        results = {}
+        for node in self.nodes:
+            futures = self.futures[node.path]
+            results[node.path] = [future.result() for future in futures]
+            self.executors[node.path].shutdown()
+            node.agent.prefetch_wall_time_s = (
+                self.finished[node.path] - self.started if futures else 0.0
+            )
+        return results
@@ -0,0 +1,387 @@
+"""
+Long-running local HTTP service around OrchestratorAgent.
+
+The API client, translation agents and embedding model are created once and
+stay warm. Concurrent requests are coalesced into micro-batches: each batch
+goes through the translation DAG once and through EmbeddingEngine.encode in a
+single call, and within each hop the batch's unique sentences are translated
+by a bounded number of concurrent API calls. Pending work is bounded; when it is full, requests are rejected
+with 503 and a Retry-After header instead of piling up.
+
+Endpoints (JSON bodies, stage keys as in pipeline.chain_key):
+    POST /translate    {"sentences": [...]}  -> {"stages", "confidences"}
+    POST /round-trip   {"sentences": [...]}  -> {"stages", "confidences", "distances"}
+    GET  /health       queue depth, batch counters, last batch's API concurrency
+"""
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import config
+from orchestrator import OrchestratorAgent
+from pipeline import chain_key
+
+
+class QueueFullError(Exception):
+    """Raised when accepting a request would exceed the pending-sentence limit."""
+
+
+class PendingRequest:
+    """Sentences of one HTTP request waiting for a micro-batch."""
+
+    def __init__(self, sentences: List[str], round_trip: bool):
+        self.sentences = sentences
+        self.round_trip = round_trip
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into batches processed by one worker thread."""
+
+    def __init__(
+        self,
+        orchestrator: OrchestratorAgent,
+        max_batch_sentences: int = config.SERVER_MAX_BATCH_SENTENCES,
+        batch_wait_ms: float = config.SERVER_BATCH_WAIT_MS,
+        max_pending_sentences: int = config.SERVER_MAX_PENDING_SENTENCES,
+        translation_concurrency: int = config.SERVER_TRANSLATION_CONCURRENCY
+    ):
+        """
+        Args:
+            orchestrator: Orchestrator whose agents and embedding engine are reused
+            max_batch_sentences: Sentences per batch (a larger request is its own batch)
+            batch_wait_ms: How long the first request of a batch waits for company
+            max_pending_sentences: Queued sentences before requests are rejected
+            translation_concurrency: Concurrent API calls per hop within a batch
+        """
+        self.orchestrator = orchestrator
+        self.max_batch_sentences = max_batch_sentences
+        self.batch_wait_s = batch_wait_ms / 1000
+        self.max_pending_sentences = max_pending_sentences
+        self.translation_concurrency = translation_concurrency
+        for agent in orchestrator.dag.agents():
+            agent.max_concurrency = translation_concurrency
+
+        self.queue = deque()
+        self.pending_sentences = 0
+        self.condition = threading.Condition()
+        self.stats = {"requests": 0, "rejected": 0, "batches": 0, "sentences": 0}
+        self.last_batch: Optional[Dict] = None
+
+        # The agents keep per-batch state, so batches run one at a time
+        self.worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, sentences: List[str], round_trip: bool) -> PendingRequest:
+        """
+        Queue a request without waiting for it.
+
+        Args:
+            sentences: Hebrew sentences
+            round_trip: Whether to compute round-trip distances
+
+        Returns:
+            Pending request; wait on its 'done' event
+
+        Raises:
+            QueueFullError: If the pending-sentence limit would be exceeded
+        """
+        request = PendingRequest(sentences, round_trip)
+        with self.condition:
+            if self.pending_sentences + len(sentences) > self.max_pending_sentences:
+                self.stats["rejected"] += 1
+                raise QueueFullError(
+                    f"{self.pending_sentences} sentences pending "
+                    f"(limit {self.max_pending_sentences})"
+                )
+            self.queue.append(request)
+            self.pending_sentences += len(sentences)
+            self.stats["requests"] += 1
+            self.condition.notify()
+        return request
+
+    def status(self) -> Dict:
+        """Queue depth and counters."""
+        with self.condition:
+            return {
+                "pending_requests": len(self.queue),
+                "pending_sentences": self.pending_sentences,
+                "max_pending_sentences": self.max_pending_sentences,
+                "translation_concurrency": self.translation_concurrency,
+                **self.stats,
+                "last_batch": self.last_batch
+            }
+
+    def _next_batch(self) -> List[PendingRequest]:
+        """Wait for a request, then gather more until the batch is full or the wait ends."""
+        with self.condition:
+            while not self.queue:
+                self.condition.wait()
+            deadline = time.perf_counter() + self.batch_wait_s
+
+            batch = [self.queue.popleft()]
+            size = len(batch[0].sentences)
+            while size < self.max_batch_sentences:
+                if self.queue:
+                    if size + len(self.queue[0].sentences) > self.max_batch_sentences:
+                        break
+                    batch.append(self.queue.popleft())
+                    size += len(batch[-1].sentences)
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+
+            self.pending_sentences -= size
+            return batch
+
+    def _run(self) -> None:
+        """Process batches forever."""
+        while True:
+            batch = self._next_batch()
+            try:
+                results = self.process(batch)
+                for request, result in zip(batch, results):
+                    request.result = result
+            except Exception as e:
+                for request in batch:
+                    request.error = str(e)
+            for request in batch:
+                request.done.set()
+
+    def process(self, batch: List[PendingRequest]) -> List[Dict]:
+        """
+        Run one micro-batch through the DAG and the embedding model.
+
+        Args:
+            batch: Requests to process together
+
+        Returns:
+            One JSON-serializable result per request
+        """
+        offsets = [0]
+        for request in batch:
+            offsets.append(offsets[-1] + len(request.sentences))
+        sentences = [sentence for request in batch for sentence in request.sentences]
+
+        print(f"\nBatch of {len(batch)} request(s), {len(sentences)} sentences")
+        dag = self.orchestrator.dag
+        start = time.perf_counter()
+        stages = dag.execute(sentences)
+        translate_s = time.perf_counter() - start
+        confidences = dag.last_confidences
+        distances = self.score(batch, offsets, stages) if dag.round_trip_chains else {}
+
+        with self.condition:
+            self.stats["batches"] += 1
+            self.stats["sentences"] += len(sentences)
+            self.last_batch = self.summarize_batch(batch, sentences, translate_s)
+
+        results = []
+        for i, request in enumerate(batch):
+            rows = slice(offsets[i], offsets[i + 1])
+            result = {
+                "stages": {chain_key(path): texts[rows] for path, texts in stages.items()},
+                "confidences": {chain_key(path): values[rows] for path, values in confidences.items()}
+            }
+            if request.round_trip:
+                result["distances"] = {key: values[i] for key, values in distances.items()}
+            results.append(result)
+        return results
+
+    def summarize_batch(
+        self,
+        batch: List[PendingRequest],
+        sentences: List[str],
+        translate_s: float
+    ) -> Dict:
+        """
+        Summarize the API calls of the batch just translated.
+
+        A hop's concurrency is its summed call latency over its wall time,
+        i.e. the average number of API calls in flight for that hop.
+
+        Returns:
+            Dictionary with batch size, calls and per-hop concurrency
+        """
+        hops = {}
+        for agent in self.orchestrator.dag.agents():
+            stats = agent.last_batch_stats
+            wall_time = stats.get("wall_time_s", 0.0)
+            hops[agent.agent_id] = {
+                "unique_sentences": stats.get("unique_sentences", 0),
+                "calls": stats.get("calls", 0),
+                "wall_time_s": round(wall_time, 3),
+                "api_concurrency": round(stats.get("latency_total_s", 0.0) / wall_time, 2)
+                if wall_time > 0 else 0.0
+            }
+        return {
+            "requests": len(batch),
+            "sentences": len(sentences),
+            "translate_s": round(translate_s, 3),
+            "calls": sum(hop["calls"] for hop in hops.values()),
+            "hops": hops
+        }
+
+    def score(
+        self,
+        batch: List[PendingRequest],
+        offsets: List[int],
+        stages: Dict
+    ) -> Dict[str, List[Optional[List[float]]]]:
+        """
+        Round-trip distances for the requests that asked for them.
+
+        Originals and the finals of every round-trip chain are embedded in a
+        single encode call.
+
+        Returns:
+            Chain key -> per-request distance lists (None for translate-only requests)
+        """
+        chains = self.orchestrator.dag.round_trip_chains
+        rows = [
+            row for i, request in enumerate(batch) if request.round_trip
+            for row in range(offsets[i], offsets[i + 1])
+        ]
+        distances = {chain_key(chain): [None] * len(batch) for chain in chains}
+        if not rows:
+            return distances
+
+        root = self.orchestrator.dag.root.path
+        texts = [stages[root][row] for row in rows]
+        for chain in chains:
+            texts += [stages[chain][row] for row in rows]
+
+        engine = self.orchestrator.get_embedding_engine()
+        embeddings = engine.encode(texts)
+        original_embeddings = embeddings[:len(rows)]
+
+        for n, chain in enumerate(chains, 1):
+            chain_distances = dict(zip(rows, engine.calculate_cosine_distances(
+                original_embeddings,
+                embeddings[n * len(rows):(n + 1) * len(rows)]
+            )))
+            for i, request in enumerate(batch):
+                if request.round_trip:
+                    distances[chain_key(chain)][i] = [
+                        chain_distances[row] for row in range(offsets[i], offsets[i + 1])
+                    ]
+        return distances
+
+
+class RoundTripHandler(BaseHTTPRequestHandler):
+    """HTTP front end; the batcher is attached to the server instance."""
+
+    ROUTES = {"/translate": False, "/round-trip": True}
+
+    def send_json(self, status: int, body: Dict, headers: Optional[Dict] = None) -> None:
+        """Send a JSON response."""
+        payload = json.dumps(body, ensure_ascii=False).encode(config.FILE_ENCODING)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        orchestrator = self.server.batcher.orchestrator
+        self.send_json(200, {
+            "status": "ok",
+            "model": orchestrator.model,
+            "chains": [chain_key(chain) for chain in orchestrator.dag.chains],
+            **self.server.batcher.status()
+        })
+
+    def do_POST(self):
+        if self.path not in self.ROUTES:
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length).decode(config.FILE_ENCODING))
+            sentences = body["sentences"]
+            if not isinstance(sentences, list) or not all(isinstance(s, str) for s in sentences):
+                raise ValueError("'sentences' must be a list of strings")
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {"error": f"Invalid request: {e}"})
+            return
+
+        batcher = self.server.batcher
+        if not sentences:
+            self.send_json(400, {"error": "No sentences given"})
+            return
+        if len(sentences) > batcher.max_pending_sentences:
+            self.send_json(413, {"error": f"At most {batcher.max_pending_sentences} sentences per request"})
+            return
+
+        try:
+            request = batcher.submit(sentences, round_trip=self.ROUTES[self.path])
+        except QueueFullError as e:
+            self.send_json(503, {"error": f"Server busy: {e}"},
+                           {"Retry-After": str(config.SERVER_RETRY_AFTER_S)})
+            return
+
+        request.done.wait()
+        if request.error:
+            self.send_json(500, {"error": request.error})
+            return
+        request.result["queue_wait_ms"] = round(
+            (time.perf_counter() - request.enqueued) * 1000, 1
+        )
+        self.send_json(200, request.result)
+
+    def log_message(self, format, *args):
+        """Keep request logging on one line per request."""
+        print(f"  {self.address_string()} {format % args}")
+
+
+def serve(
+    orchestrator: OrchestratorAgent,
+    host: str = config.SERVER_HOST,
+    port: int = config.SERVER_PORT,
+    **batcher_kwargs
+) -> None:
+    """
+    Warm up the orchestrator and serve requests until interrupted.
+
+    Args:
+        orchestrator: Orchestrator to wrap
+        host: Interface to bind (local only by default)
+        port: TCP port
+        **batcher_kwargs: Overrides for MicroBatcher limits
+    """
+    if orchestrator.dag.round_trip_chains:
+        orchestrator.get_embedding_engine()
+
+    server = ThreadingHTTPServer((host, port), RoundTripHandler)
+    server.daemon_threads = True
+    server.batcher = MicroBatcher(orchestrator, **batcher_kwargs)
+
+    print("\n" + "="*60)
+    print(f"ROUND-TRIP SERVICE listening on http://{host}:{port}")
+    print("="*60)
+    print("  POST /translate    POST /round-trip    GET /health")
+    print(f"  Batches: up to {server.batcher.max_batch_sentences} sentences, "
+          f"{server.batcher.batch_wait_s * 1000:.0f} ms wait; "
+          f"503 above {server.batcher.max_pending_sentences} pending sentences")
+    print(f"  Translation: up to {server.batcher.translation_concurrency} concurrent "
+          f"API calls per hop")
+    print("="*60)
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
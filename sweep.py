@@ -0,0 +1,353 @@
+"""
+Experiment sweep runner.
+
+Runs a grid of OrchestratorAgent configurations concurrently in one process,
+sharing the API client, the embedding model, the metric worker processes and
+generated sentence corpora.
+"""
+import csv
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import config
+from metrics import MetricEngine
+from orchestrator import OrchestratorAgent, SentenceGenerator
+from pipeline import chain_key, parse_chain, validate_chains
+from utils import EmbeddingEngine, FileManager
+
+# Parameters a sweep configuration may set
+SWEEP_PARAMETERS = (
+    "num_sentences",
+    "topic",
+    "temperature",
+    "model",
+    "chains",
+    "lean_responses",
+    "routing",
+    "hedging",
+    "round_trip"
+)
+
+# Orchestrator constructor arguments (the rest go to OrchestratorAgent.run)
+AGENT_PARAMETERS = ("temperature", "model", "chains", "lean_responses", "routing", "hedging")
+
+
+def load_sweep_configs(grid_file: Path) -> Tuple[List[Dict], int]:
+    """
+    Expand a sweep grid file into a list of run configurations.
+
+    The file is a JSON object with optional shared defaults (any of
+    SWEEP_PARAMETERS), a "grid" of parameter lists expanded as a cartesian
+    product, explicit "runs", and "max_parallel":
+
+        {
+          "num_sentences": 20,
+          "grid": {"topic": ["technology", "nature"], "temperature": [0.0, 0.3]},
+          "runs": [{"model": "claude-3-5-haiku-latest"}],
+          "max_parallel": 4
+        }
+
+    Args:
+        grid_file: Path to the JSON grid file
+
+    Returns:
+        Tuple of (run configurations, max parallel runs)
+
+    Raises:
+        ValueError: Listing every unknown parameter and invalid configuration
+    """
+    with open(grid_file, 'r', encoding=config.FILE_ENCODING) as f:
+        spec = json.load(f)
+
+    base = {key: spec[key] for key in SWEEP_PARAMETERS if key in spec}
+    grid = spec.get("grid", {})
+    runs = spec.get("runs", [])
+
+    unknown = [
+        key for key in dict.fromkeys(list(grid) + [key for run in runs for key in run])
+        if key not in SWEEP_PARAMETERS
+    ]
+    if unknown:
+        raise ValueError(
+            f"Unknown sweep parameter(s) {', '.join(repr(key) for key in unknown)}. "
+            f"Supported: {', '.join(SWEEP_PARAMETERS)}"
+        )
+
+    configs = []
+    if grid:
+        keys = list(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            configs.append({**base, **dict(zip(keys, values))})
+    configs += [{**base, **run} for run in runs]
+    if not configs:
+        configs = [base]
+
+    errors = []
+    for index, run_config in enumerate(configs, 1):
+        run_config.setdefault("num_sentences", 20)
+        errors += [
+            f"{run_name(index, run_config)}: {error}"
+            for error in config_errors(run_config)
+        ]
+    if errors:
+        raise ValueError(
+            f"{len(errors)} invalid sweep configuration(s):\n"
+            + "\n".join(f"  - {error}" for error in errors)
+        )
+
+    return configs, int(spec.get("max_parallel", config.SWEEP_MAX_PARALLEL))
+
+
+def config_errors(run_config: Dict) -> List[str]:
+    """
+    Check a run configuration before anything is generated or translated.
+
+    Parses "chains" in place (strings like 'he,en,fr,he' become tuples).
+
+    Args:
+        run_config: Configuration dictionary
+
+    Returns:
+        Error messages (empty if the configuration is valid)
+    """
+    errors = []
+
+    num_sentences = run_config["num_sentences"]
+    if isinstance(num_sentences, bool) or not isinstance(num_sentences, int) or \
+            not config.MIN_SENTENCES <= num_sentences <= config.MAX_SENTENCES:
+        errors.append(
+            f"num_sentences must be an integer between {config.MIN_SENTENCES} "
+            f"and {config.MAX_SENTENCES}, got {num_sentences!r}"
+        )
+
+    temperature = run_config.get("temperature")
+    if temperature is not None and (
+        isinstance(temperature, bool) or not isinstance(temperature, (int, float))
+        or not 0.0 <= temperature <= 1.0
+    ):
+        errors.append(f"temperature must be between 0 and 1, got {temperature!r}")
+
+    for key in ("topic", "model"):
+        if run_config.get(key) is not None and not isinstance(run_config[key], str):
+            errors.append(f"{key} must be a string, got {run_config[key]!r}")
+
+    for key in ("lean_responses", "routing", "hedging", "round_trip"):
+        if key in run_config and not isinstance(run_config[key], bool):
+            errors.append(f"{key} must be true or false, got {run_config[key]!r}")
+
+    if "chains" in run_config:
+        try:
+            run_config["chains"] = [
+                parse_chain(chain) if isinstance(chain, str) else tuple(chain)
+                for chain in run_config["chains"]
+            ]
+            validate_chains(run_config["chains"])
+            if run_config["chains"][0][0] != "he":
+                raise ValueError(
+                    f"Language chains must start from Hebrew ('he'), "
+                    f"got '{run_config['chains'][0][0]}'"
+                )
+        except (TypeError, ValueError) as e:
+            errors.append(f"chains: {e}")
+
+    return errors
+
+
+def run_name(index: int, run_config: Dict) -> str:
+    """Directory-safe name for a run, e.g. 'run02_topic-nature_temperature-0.3'."""
+    parts = [f"run{index:02d}"]
+    for key in ("topic", "model", "temperature", "num_sentences"):
+        if key in run_config and run_config[key] is not None:
+            value = "".join(c if c.isalnum() or c in ".-" else "-" for c in str(run_config[key]))
+            parts.append(f"{key}-{value}")
+    return "_".join(parts)
+
+
+class SweepRunner:
+    """Schedules sweep configurations concurrently with shared warm resources."""
+
+    def __init__(
+        self,
+        grid_file: Path,
+        max_parallel: Optional[int] = None,
+        output_dir: Optional[Path] = None
+    ):
+        """
+        Load the sweep grid and prepare the output directory.
+
+        Args:
+            grid_file: Path to the JSON grid file
+            max_parallel: Override for the number of concurrent runs
+            output_dir: Sweep output directory (default: OUTPUT_DIR/sweep_<timestamp>)
+        """
+        self.configs, grid_parallel = load_sweep_configs(Path(grid_file))
+        self.max_parallel = max_parallel or grid_parallel
+        self.output_dir = Path(output_dir) if output_dir else (
+            config.OUTPUT_DIR / f"sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        )
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        self.file_manager = FileManager()
+        self.embedding_engine = None
+        self.metric_engine = None
+        self.corpora = {}
+
+    def prepare(self) -> None:
+        """Load the embedding model and generate each distinct corpus once."""
+        if any(run_config.get("round_trip", True) for run_config in self.configs):
+            self.embedding_engine = EmbeddingEngine()
+            self.metric_engine = MetricEngine()
+
+        # Corpora need only the sentence generator, not a DAG of agents
+        generator = SentenceGenerator()
+        keys = {(c["num_sentences"], c.get("topic")) for c in self.configs}
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            futures = {
+                key: executor.submit(generator.generate, *key)
+                for key in keys
+            }
+            self.corpora = {key: future.result() for key, future in futures.items()}
+
+    def run_one(self, index: int, run_config: Dict) -> Dict:
+        """
+        Run a single configuration against its shared corpus.
+
+        Args:
+            index: Position of the configuration in the sweep
+            run_config: Configuration dictionary
+
+        Returns:
+            Run summary from OrchestratorAgent.run, plus name and configuration
+        """
+        name = run_name(index, run_config)
+        orchestrator = OrchestratorAgent(
+            output_dir=self.output_dir / name,
+            embedding_engine=self.embedding_engine,
+            metric_engine=self.metric_engine,
+            **{key: run_config[key] for key in AGENT_PARAMETERS if key in run_config}
+        )
+        summary = orchestrator.run(
+            num_sentences=run_config["num_sentences"],
+            round_trip=run_config.get("round_trip", True),
+            topic=run_config.get("topic"),
+            hebrew_original=self.corpora[(run_config["num_sentences"], run_config.get("topic"))]
+        )
+        return {"name": name, "config": run_config, **summary}
+
+    def run(self) -> List[Dict]:
+        """
+        Run the whole sweep and write the comparison table.
+
+        Returns:
+            List of run summaries, in grid order
+        """
+        print(f"\nSweep: {len(self.configs)} configurations, "
+              f"up to {self.max_parallel} in parallel")
+        self.prepare()
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            futures = [
+                executor.submit(self.run_one, index, run_config)
+                for index, run_config in enumerate(self.configs, 1)
+            ]
+            summaries = []
+            for index, future in enumerate(futures, 1):
+                try:
+                    summaries.append(future.result())
+                except Exception as e:
+                    summaries.append({
+                        "name": run_name(index, self.configs[index - 1]),
+                        "config": self.configs[index - 1],
+                        "error": str(e)
+                    })
+
+        if self.metric_engine is not None:
+            self.metric_engine.close()
+
+        rows = self.comparison_rows(summaries)
+        self.save_summary(summaries, rows)
+        self.print_comparison(rows)
+        return summaries
+
+    @staticmethod
+    def comparison_rows(summaries: List[Dict]) -> List[Dict]:
+        """Flatten run summaries into one row per (run, round-trip chain)."""
+        rows = []
+        for summary in summaries:
+            run_config = summary["config"]
+            base = {
+                "run": summary["name"],
+                "model": run_config.get("model", config.MODEL_NAME),
+                "temperature": run_config.get("temperature", config.TEMPERATURE),
+                "topic": run_config.get("topic") or "Mixed",
+                "num_sentences": run_config["num_sentences"]
+            }
+            if "error" in summary:
+                rows.append({**base, "chain": "", "error": summary["error"]})
+                continue
+
+            performance = summary.get("performance", {})
+            timing = {
+                "output_tokens_per_sentence": round(performance.get("output_tokens_per_sentence", 0.0), 1),
+                "latency_per_sentence_s": round(performance.get("latency_per_sentence_s", 0.0), 3)
+            }
+            chains = summary["chains"] or {"": {}}
+            for key, stats in chains.items():
+                rows.append({
+                    **base,
+                    "chain": key,
+                    "mean_distance": stats.get("mean_distance"),
+                    "std_distance": stats.get("std_distance"),
+                    **stats.get("metrics", {}),
+                    **timing
+                })
+        return rows
+
+    def save_summary(self, summaries: List[Dict], rows: List[Dict]) -> None:
+        """Write sweep_summary.json and sweep_summary.csv."""
+        serializable = [
+            {**s, "config": {
+                k: ([chain_key(c) for c in v] if k == "chains" else v)
+                for k, v in s["config"].items()
+            }}
+            for s in summaries
+        ]
+        self.file_manager.save_metrics(
+            {"runs": serializable, "timestamp": datetime.now().isoformat()},
+            self.output_dir / "sweep_summary.json"
+        )
+
+        fields = list(dict.fromkeys(key for row in rows for key in row))
+        csv_path = self.output_dir / "sweep_summary.csv"
+        with open(csv_path, 'w', encoding=config.FILE_ENCODING, newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"[✓] Saved: {csv_path.name} ({len(rows)} rows)")
+
+    @staticmethod
+    def print_comparison(rows: List[Dict]) -> None:
+        """Print the comparison table (tokens and latency are per sentence)."""
+        print("\n" + "="*60)
+        print("SWEEP COMPARISON")
+        print("="*60)
+        print(f"{'Run':<40} {'Chain':<14} {'Mean':>8} {'Std':>8} {'Tokens':>7} {'Lat(s)':>7}")
+        for row in rows:
+            if "error" in row:
+                print(f"{row['run']:<40} FAILED: {row['error']}")
+                continue
+            mean, std = (
+                "-" if row[key] is None else f"{row[key]:.4f}"
+                for key in ("mean_distance", "std_distance")
+            )
+            print(
+                f"{row['run'][:40]:<40} {row['chain'][:14]:<14} "
+                f"{mean:>8} {std:>8} "
+                f"{row['output_tokens_per_sentence']:>7.1f} "
+                f"{row['latency_per_sentence_s']:>7.2f}"
+            )
+        print("="*60)
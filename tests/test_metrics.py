@@ -0,0 +1,51 @@
+"""
+Tests for the vectorized Levenshtein distance.
+"""
+import random
+
+import pytest
+
+from metrics import EditDistance
+
+
+def reference_levenshtein(source, target):
+    """Textbook dynamic-programming Levenshtein distance."""
+    previous = list(range(len(target) + 1))
+    for i, source_char in enumerate(source, 1):
+        current = [i]
+        for j, target_char in enumerate(target, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (source_char != target_char)
+            ))
+        previous = current
+    return previous[-1]
+
+
+@pytest.mark.parametrize("source, target, expected", [
+    ("", "", 0),
+    ("", "abc", 3),
+    ("abc", "", 3),
+    ("abc", "abc", 0),
+    ("kitten", "sitting", 3),
+    ("flaw", "lawn", 2),
+    ("שלום", "שלומות", 3),  # final mem (ם) differs from medial mem (מ)
+])
+def test_levenshtein_known_distances(source, target, expected):
+    assert EditDistance.levenshtein(source, target) == expected
+
+
+def test_levenshtein_matches_reference():
+    rng = random.Random(0)
+    alphabet = "abcאב "
+    for _ in range(200):
+        source = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        target = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        assert EditDistance.levenshtein(source, target) == reference_levenshtein(source, target)
+
+
+def test_edit_distance_scores_are_normalized():
+    metric = EditDistance()
+    scores = metric.scores(metric.statistics(["abcd", ""], ["abce", ""]))
+    assert scores.tolist() == [0.25, 0.0]
@@ -0,0 +1,68 @@
+"""
+Tests for TranslationDAG prefix sharing and branch execution.
+"""
+import threading
+
+import pytest
+
+import pipeline
+from pipeline import TranslationDAG
+
+
+class FakeAgent:
+    """Records its batches and appends the target language to each sentence."""
+
+    def __init__(self, source_lang, target_lang, **kwargs):
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.batches = []
+        self.last_results = []
+        self.lock = threading.Lock()
+
+    def batch_translate(self, sentences, precomputed=None):
+        with self.lock:
+            self.batches.append(list(sentences))
+        self.last_results = [{"confidence": 0.9} for _ in sentences]
+        return [f"{sentence}>{self.target_lang}" for sentence in sentences]
+
+
+@pytest.fixture
+def fake_agents(monkeypatch):
+    monkeypatch.setattr(pipeline, "create_agent", FakeAgent)
+
+
+def test_shared_prefix_gets_one_agent(fake_agents):
+    dag = TranslationDAG([("he", "en", "fr", "he"), ("he", "en", "es", "he")])
+    paths = [path for path, node in dag.nodes.items() if node.agent is not None]
+    assert sorted(paths) == sorted([
+        ("he", "en"),
+        ("he", "en", "fr"), ("he", "en", "fr", "he"),
+        ("he", "en", "es"), ("he", "en", "es", "he"),
+    ])
+    assert len(dag.agents()) == 5
+    assert dag.round_trip_chains == [("he", "en", "fr", "he"), ("he", "en", "es", "he")]
+
+
+def test_shared_prefix_is_translated_once(fake_agents):
+    dag = TranslationDAG([("he", "en", "fr", "he"), ("he", "en", "es", "he")])
+    stages = dag.execute(["a", "b"])
+
+    assert dag.nodes[("he", "en")].agent.batches == [["a", "b"]]
+    assert stages[("he",)] == ["a", "b"]
+    assert stages[("he", "en")] == ["a>en", "b>en"]
+    assert stages[("he", "en", "fr", "he")] == ["a>en>fr>he", "b>en>fr>he"]
+    assert stages[("he", "en", "es", "he")] == ["a>en>es>he", "b>en>es>he"]
+    assert dag.nodes[("he", "en", "es")].agent.batches == [["a>en", "b>en"]]
+    assert set(dag.last_confidences) == {path for path in stages if len(path) > 1}
+
+
+@pytest.mark.parametrize("chains, message", [
+    ([], "At least one"),
+    ([("he",)], "at least one hop"),
+    ([("he", "en"), ("en", "fr")], "same language"),
+    ([("he", "he")], "no-op hop"),
+    ([("he", "xx")], "Unknown language"),
+])
+def test_invalid_chains_are_rejected(fake_agents, chains, message):
+    with pytest.raises(ValueError, match=message):
+        TranslationDAG(chains)
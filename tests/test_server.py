@@ -0,0 +1,91 @@
+"""
+Tests for MicroBatcher backpressure and batching.
+"""
+import threading
+import time
+
+import pytest
+
+from server import MicroBatcher, QueueFullError
+
+
+class FakeDAG:
+    def agents(self):
+        return []
+
+
+class FakeOrchestrator:
+    dag = FakeDAG()
+
+
+class BlockingBatcher(MicroBatcher):
+    """Holds every batch until released, so the queue can fill up."""
+
+    def __init__(self, **kwargs):
+        self.release = threading.Event()
+        self.batches = []
+        super().__init__(FakeOrchestrator(), batch_wait_ms=0, **kwargs)
+
+    def process(self, batch):
+        self.batches.append([len(request.sentences) for request in batch])
+        self.release.wait()
+        return [{"sentences": request.sentences} for request in batch]
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise AssertionError("Timed out waiting for the batcher")
+        time.sleep(0.01)
+
+
+def test_requests_beyond_pending_limit_are_rejected():
+    batcher = BlockingBatcher(max_batch_sentences=2, max_pending_sentences=5)
+    try:
+        first = batcher.submit(["a", "b"], round_trip=False)
+        wait_until(lambda: batcher.batches)  # worker busy, queue empty
+
+        queued = [
+            batcher.submit(["c", "d", "e"], round_trip=False),
+            batcher.submit(["f", "g"], round_trip=False),
+        ]
+        with pytest.raises(QueueFullError):
+            batcher.submit(["h"], round_trip=False)
+
+        status = batcher.status()
+        assert status["pending_sentences"] == 5
+        assert status["rejected"] == 1
+        assert status["requests"] == 3
+    finally:
+        batcher.release.set()
+
+    for request in [first] + queued:
+        assert request.done.wait(2.0)
+        assert request.error is None
+    assert batcher.status()["pending_sentences"] == 0
+
+
+def test_capacity_frees_up_as_batches_are_taken():
+    batcher = BlockingBatcher(max_batch_sentences=4, max_pending_sentences=4)
+    try:
+        batcher.submit(["a", "b", "c", "d"], round_trip=False)
+        wait_until(lambda: batcher.batches)
+        # The running batch no longer counts against the limit
+        batcher.submit(["e", "f", "g", "h"], round_trip=False)
+    finally:
+        batcher.release.set()
+
+
+def test_small_requests_are_coalesced():
+    batcher = BlockingBatcher(max_batch_sentences=4, max_pending_sentences=10)
+    try:
+        batcher.submit(["a"], round_trip=False)
+        wait_until(lambda: batcher.batches)
+        requests = [batcher.submit([s], round_trip=False) for s in "bcde"]
+        batcher.release.set()
+        for request in requests:
+            assert request.done.wait(2.0)
+        assert batcher.batches[1:] == [[1, 1, 1, 1]]
+    finally:
+        batcher.release.set()
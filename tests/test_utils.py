@@ -0,0 +1,69 @@
+"""
+Tests for the streamed JSON array parser and sentence deduplication.
+"""
+import pytest
+
+from utils import JSONArrayStreamParser, dedup_index
+
+
+def parse(text, chunk_size=3):
+    """Feed text in small chunks, as a streamed response arrives."""
+    parser = JSONArrayStreamParser()
+    sentences = []
+    for start in range(0, len(text), chunk_size):
+        sentences += parser.feed(text[start:start + chunk_size])
+    parser.close()
+    return sentences
+
+
+def test_parser_yields_strings_across_chunks():
+    assert parse('["שלום עולם", "second"]') == ["שלום עולם", "second"]
+
+
+def test_parser_yields_each_string_when_its_quote_arrives():
+    parser = JSONArrayStreamParser()
+    assert parser.feed('["one", "tw') == ["one"]
+    assert parser.feed('o"]') == ["two"]
+    parser.close()
+
+
+def test_parser_decodes_escapes():
+    assert parse(r'["say \"hi\"", "א"]') == ['say "hi"', "א"]
+
+
+def test_parser_skips_code_fence():
+    assert parse('```json\n["a", "b"]\n```') == ["a", "b"]
+
+
+@pytest.mark.parametrize("text", [
+    'Here are the sentences [1]: ["a"]',
+    '{"sentences": ["a"]}',
+    '```json\n{"sentences": ["a"]}\n```',
+])
+def test_parser_rejects_anything_but_a_leading_array(text):
+    with pytest.raises(ValueError, match="not a list"):
+        parse(text)
+
+
+def test_parser_rejects_non_string_items():
+    with pytest.raises(ValueError, match="expected only strings"):
+        parse('["a", 1]')
+
+
+def test_parser_close_rejects_unterminated_array():
+    parser = JSONArrayStreamParser()
+    parser.feed('["a", "b"')
+    with pytest.raises(ValueError, match="closed"):
+        parser.close()
+
+
+def test_dedup_index_maps_duplicates_to_first_occurrence():
+    first_rows, owners = dedup_index(["a", "b", "a", "c", "b"])
+    assert first_rows == [0, 1, 3]
+    assert owners == [0, 1, 0, 2, 1]
+
+
+def test_dedup_index_matches_only_identical_strings():
+    first_rows, owners = dedup_index(["a", "a ", "שׁ", "שׁ"])
+    assert first_rows == [0, 1, 2, 3]
+    assert owners == [0, 1, 2, 3]
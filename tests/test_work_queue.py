@@ -0,0 +1,64 @@
+"""
+Tests for WorkQueue leases: expiry, reassignment and the attempt limit.
+"""
+import time
+
+import pytest
+
+import config
+from work_queue import WorkQueue
+
+SENTENCES = [f"sentence {i}" for i in range(1, 5)]
+
+
+def make_queue(tmp_path, lease_seconds):
+    queue = WorkQueue(tmp_path / "queue.sqlite", lease_seconds=lease_seconds)
+    queue.initialize(SENTENCES, shard_size=2, job={"chains": ["he-en-fr-he"]})
+    return queue
+
+
+def test_leased_shard_is_not_handed_out_twice(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=60)
+    assert queue.claim("worker-a") == (1, SENTENCES[:2])
+    assert queue.claim("worker-b") == (2, SENTENCES[2:])
+    assert queue.claim("worker-c") is None
+
+
+def test_expired_lease_is_reassigned(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.05)
+    shard_id, _ = queue.claim("worker-a")
+    queue.claim("worker-b")
+    time.sleep(0.1)
+
+    # worker-b's shard expired too; the lowest expired shard goes first
+    assert queue.claim("worker-c") == (shard_id, SENTENCES[:2])
+    assert not queue.renew(shard_id, "worker-a")
+    assert not queue.complete(shard_id, "worker-a", {"stages": {}})
+    assert queue.complete(shard_id, "worker-c", {"stages": {}})
+
+
+def test_renewed_lease_does_not_expire(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.2)
+    shard_id, _ = queue.claim("worker-a")
+    for _ in range(3):
+        time.sleep(0.1)
+        assert queue.renew(shard_id, "worker-a")
+    assert queue.claim("worker-b")[0] != shard_id
+
+
+def test_expired_lease_fails_after_max_attempts(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "QUEUE_MAX_ATTEMPTS", 1)
+    queue = make_queue(tmp_path, lease_seconds=0.05)
+    shard_id, _ = queue.claim("worker-a")
+    time.sleep(0.1)
+
+    assert queue.claim("worker-b")[0] != shard_id
+    failures = queue.failures()
+    assert [failure["shard_id"] for failure in failures] == [shard_id]
+    assert failures[0]["error"] == "Lease expired"
+
+
+def test_initialize_rejects_empty_corpus(tmp_path):
+    queue = WorkQueue(tmp_path / "queue.sqlite")
+    with pytest.raises(ValueError):
+        queue.initialize([], shard_size=2, job={})
@@ -2,17 +2,41 @@
 Utility functions for vectorization, file I/O, and visualization.
 """
 import json
+import threading
 from pathlib import Path
-from typing import List, Dict, Tuple
+from statistics import NormalDist
+from typing import List, Dict, Optional, Tuple
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from sentence_transformers import SentenceTransformer
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from datetime import datetime
 
 import config
 
 
+def dedup_index(sentences: List[str]) -> Tuple[List[int], List[int]]:
+    """
+    Map sentences to their unique strings (byte-identical matches only).
+
+    Args:
+        sentences: Sentences, possibly with duplicates
+
+    Returns:
+        Tuple of (row of the first occurrence of each unique string,
+        unique position of every row)
+    """
+    positions = {}
+    first_rows = []
+    owners = []
+    for row, sentence in enumerate(sentences):
+        if sentence not in positions:
+            positions[sentence] = len(first_rows)
+            first_rows.append(row)
+        owners.append(positions[sentence])
+    return first_rows, owners
+
+
 class EmbeddingEngine:
     """Handles text vectorization using sentence transformers."""
 
@@ -20,19 +44,60 @@ class EmbeddingEngine:
         """Initialize the embedding model."""
         print(f"Loading embedding model: {model_name}...")
         self.model = SentenceTransformer(model_name)
+        self._lock = threading.Lock()  # Shared across concurrent runs
         print("Embedding model loaded successfully.")
 
     def encode(self, sentences: List[str]) -> np.ndarray:
         """
         Encode sentences into vectors.
 
+        Each unique sentence is encoded once; identical duplicates share its row.
+
         Args:
             sentences: List of sentences to encode
 
         Returns:
             Numpy array of embeddings
         """
-        return self.model.encode(sentences, show_progress_bar=True)
+        first_rows, owners = dedup_index(sentences)
+        if len(first_rows) == len(sentences):
+            unique = sentences
+        else:
+            unique = [sentences[row] for row in first_rows]
+            print(f"  Encoding {len(unique)} unique of {len(sentences)} sentences")
+
+        with self._lock:
+            embeddings = self.model.encode(unique, show_progress_bar=True)
+        return embeddings if unique is sentences else embeddings[owners]
+
+    def encode_round_trip(
+        self,
+        finals: List[str],
+        originals: List[str],
+        original_embeddings: np.ndarray
+    ) -> np.ndarray:
+        """
+        Encode round-trip sentences, reusing the original's embedding when identical.
+
+        Args:
+            finals: Sentences after the round trip
+            originals: Original sentences (aligned with finals)
+            original_embeddings: Embeddings of the originals
+
+        Returns:
+            Numpy array of embeddings of the final sentences
+        """
+        changed = [
+            i for i, (original, final) in enumerate(zip(originals, finals))
+            if original != final
+        ]
+        final_embeddings = np.array(original_embeddings, copy=True)
+        if changed:
+            final_embeddings[changed] = self.encode([finals[i] for i in changed])
+        if len(changed) < len(finals):
+            print(f"  {len(finals) - len(changed)} of {len(finals)} sentences unchanged "
+                  f"by the round trip (distance 0, not re-encoded)")
+        return final_embeddings
 
     def calculate_cosine_distances(
         self,
@@ -47,17 +112,19 @@ class EmbeddingEngine:
             final_embeddings: Embeddings of final sentences
 
         Returns:
-            List of cosine distances (1 - cosine_similarity)
+            List of cosine distances (1 - cosine_similarity); identical
+            embeddings get exactly 0.0
         """
-        distances = []
-        for i in range(len(original_embeddings)):
-            similarity = cosine_similarity(
-                [original_embeddings[i]],
-                [final_embeddings[i]]
-            )[0][0]
-            distance = 1 - similarity
-            distances.append(float(distance))
-        return distances
+        original_embeddings = np.asarray(original_embeddings, dtype=np.float64)
+        final_embeddings = np.asarray(final_embeddings, dtype=np.float64)
+        norms = (np.linalg.norm(original_embeddings, axis=1)
+                 * np.linalg.norm(final_embeddings, axis=1))
+        similarity = np.einsum('ij,ij->i', original_embeddings, final_embeddings) / np.maximum(norms, 1e-12)
+
+        # Rounding leaves equal vectors at about -1e-7 instead of zero
+        distances = 1 - similarity
+        distances[np.all(original_embeddings == final_embeddings, axis=1)] = 0.0
+        return [float(distance) for distance in distances]
 
 
 class FileManager:
@@ -140,7 +207,9 @@ class Visualizer:
     def plot_quality_graph(
         distances: List[float],
         mean_distance: float,
-        output_path: Path = config.QUALITY_GRAPH_FILE
+        output_path: Path = config.QUALITY_GRAPH_FILE,
+        chain_title: str = "Hebrew → English → French → Hebrew",
+        metrics: Optional[Dict] = None
     ) -> None:
         """
         Create and save quality analysis graph.
@@ -149,12 +218,20 @@ class Visualizer:
             distances: List of cosine distances
             mean_distance: Mean distance value
             output_path: Path to save the graph
+            chain_title: Language chain shown in the title
+            metrics: Optional surface metrics (see metrics.MetricJob.result),
+                plotted per sentence in a second panel
         """
-        plt.figure(figsize=config.GRAPH_FIGSIZE)
+        # A private Figure with an Agg canvas instead of pyplot's global current
+        # figure, so concurrent runs (e.g. a sweep) can plot from worker threads
+        width, height = config.GRAPH_FIGSIZE
+        figure = Figure(figsize=(width, height * 1.6) if metrics else config.GRAPH_FIGSIZE)
+        FigureCanvasAgg(figure)
+        axes = figure.add_subplot(2, 1, 1) if metrics else figure.add_subplot(1, 1, 1)
 
         # Plot individual distances
         sentence_numbers = list(range(1, len(distances) + 1))
-        plt.plot(
+        axes.plot(
             sentence_numbers,
             distances,
             marker='o',
@@ -166,7 +243,7 @@ class Visualizer:
         )
 
         # Plot mean line
-        plt.axhline(
+        axes.axhline(
             y=mean_distance,
             color='#E63946',
             linestyle='--',
@@ -175,24 +252,107 @@ class Visualizer:
         )
 
         # Styling
-        plt.xlabel('Sentence Number', fontsize=12, fontweight='bold')
-        plt.ylabel('Cosine Distance', fontsize=12, fontweight='bold')
-        plt.title(
-            'Round-Trip Translation Quality Analysis\n(Hebrew → English → French → Hebrew)',
+        axes.set_xlabel('Sentence Number', fontsize=12, fontweight='bold')
+        axes.set_ylabel('Cosine Distance', fontsize=12, fontweight='bold')
+        axes.set_title(
+            f'Round-Trip Translation Quality Analysis\n({chain_title})',
             fontsize=14,
             fontweight='bold',
             pad=20
         )
-        plt.legend(loc='best', fontsize=10, framealpha=0.9)
-        plt.grid(True, alpha=0.3, linestyle='--')
-        plt.tight_layout()
-
-        # Save
-        plt.savefig(output_path, dpi=config.GRAPH_DPI, bbox_inches='tight')
+        axes.legend(loc='best', fontsize=10, framealpha=0.9)
+        axes.grid(True, alpha=0.3, linestyle='--')
+
+        # Surface metrics share the sentence axis (all scores are in [0, 1])
+        if metrics:
+            axes = figure.add_subplot(2, 1, 2)
+            for result in metrics.values():
+                direction = '↑' if result['higher_is_better'] else '↓'
+                axes.plot(
+                    sentence_numbers,
+                    result['scores'],
+                    marker='.',
+                    linestyle='-',
+                    linewidth=1.5,
+                    label=f"{result['label']} {direction} (corpus {result['corpus']:.4f})"
+                )
+            axes.set_xlabel('Sentence Number', fontsize=12, fontweight='bold')
+            axes.set_ylabel('Score', fontsize=12, fontweight='bold')
+            axes.set_ylim(-0.05, 1.05)
+            axes.legend(loc='best', fontsize=10, framealpha=0.9)
+            axes.grid(True, alpha=0.3, linestyle='--')
+
+        figure.tight_layout()
+
+        # Save (the figure is not registered with pyplot, so nothing to close)
+        figure.savefig(output_path, dpi=config.GRAPH_DPI, bbox_inches='tight')
         print(f"[✓] Saved: {output_path.name} ({output_path.stat().st_size / 1024:.0f} KB)")
 
-        # Close to free memory
-        plt.close()
+
+class JSONArrayStreamParser:
+    """
+    Incremental parser for a streamed JSON array of strings.
+
+    Like the non-streaming parser, the response must be the array itself:
+    after leading whitespace and an optional ```json fence line, the first
+    character has to be the opening bracket. Text after the closing bracket
+    (e.g. the closing fence) is ignored. Each string is returned by feed()
+    as soon as its closing quote arrives.
+    """
+
+    def __init__(self):
+        self.state = "before"  # before (<-> fence) -> array <-> string -> done
+        self.chars: List[str] = []
+        self.escaped = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Consume the next chunk of streamed text.
+
+        Args:
+            chunk: Text fragment
+
+        Returns:
+            Strings completed within this chunk
+        """
+        completed = []
+        for char in chunk:
+            if self.state == "string":
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    # Let json decode escapes such as \" and \u05d0
+                    completed.append(json.loads('"' + "".join(self.chars) + '"'))
+                    self.state = "array"
+                    continue
+                self.chars.append(char)
+            elif self.state == "array":
+                if char == '"':
+                    self.chars = []
+                    self.state = "string"
+                elif char == "]":
+                    self.state = "done"
+                elif not (char.isspace() or char == ","):
+                    raise ValueError(f"Unexpected {char!r} in array; expected only strings")
+            elif self.state == "fence":
+                # Skip the rest of the fence line (e.g. "json")
+                if char == "\n":
+                    self.state = "before"
+            elif self.state == "before":
+                if char == "[":
+                    self.state = "array"
+                elif char == "`":
+                    self.state = "fence"
+                elif not char.isspace():
+                    raise ValueError("Response is not a list")
+        return completed
+
+    def close(self) -> None:
+        """Check that the whole array was received."""
+        if self.state != "done":
+            raise ValueError("Response ended before the JSON array was closed")
 
 
 class StatsCalculator:
@@ -222,6 +382,31 @@ class StatsCalculator:
             "timestamp": datetime.now().isoformat()
         }
 
+    @staticmethod
+    def confidence_interval(
+        distances: List[float],
+        confidence: float = config.SAMPLING_CONFIDENCE
+    ) -> Tuple[float, float, float]:
+        """
+        Normal-approximation confidence interval for the mean distance.
+
+        Args:
+            distances: Sampled cosine distances
+            confidence: Confidence level (e.g. 0.95)
+
+        Returns:
+            Tuple of (mean, lower bound, upper bound); the bounds are
+            infinite until at least two samples are available
+        """
+        distances_array = np.array(distances, dtype=float)
+        mean = float(np.mean(distances_array)) if len(distances_array) else 0.0
+        if len(distances_array) < 2:
+            return mean, float("-inf"), float("inf")
+
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        half_width = z * float(np.std(distances_array, ddof=1)) / np.sqrt(len(distances_array))
+        return mean, mean - half_width, mean + half_width
+
     @staticmethod
     def print_statistics(stats: Dict) -> None:
         """
@@ -239,14 +424,56 @@ class StatsCalculator:
         print(f"Min Distance:        {stats['min_distance']:.4f}")
         print(f"Max Distance:        {stats['max_distance']:.4f}")
         print(f"Median Distance:     {stats['median_distance']:.4f}")
+        for result in stats.get("metrics", {}).values():
+            print(f"{result['label'] + ':':<21}{result['corpus']:.4f} corpus, "
+                  f"{result['mean']:.4f} ± {result['std']:.4f} per sentence")
+        if "sampling" in stats:
+            sampling = stats["sampling"]
+            interval = (
+                f"[{sampling['ci_low']:.4f}, {sampling['ci_high']:.4f}]"
+                if sampling['ci_low'] is not None else "n/a (fewer than 2 samples)"
+            )
+            print(f"{sampling['confidence']:.0%} CI:              {interval}")
+            print(f"Sampled:             {stats['num_sentences']} of {sampling['corpus_size']} "
+                  f"({sampling['api_calls']} API calls, stopped: {sampling['stop_reason']})")
+        print("="*60)
+
+    @staticmethod
+    def print_performance(performance: Dict) -> None:
+        """
+        Print per-agent latency and output token usage.
+
+        Args:
+            performance: Performance dictionary from the orchestrator
+        """
+        print("\n" + "="*60)
+        print(f"PERFORMANCE SUMMARY ({performance['response_mode']} responses)")
+        print("="*60)
+        for agent in performance["agents"]:
+            if not agent.get("calls"):
+                continue
+            print(f"{agent['agent_id']}:")
+            print(f"  Output tokens/sentence: {agent['output_tokens_per_sentence']:.1f}")
+            print(f"  Latency mean/p95:       {agent['latency_mean_s']:.2f}s / {agent['latency_p95_s']:.2f}s")
+            routing = agent.get("routing")
+            if routing:
+                print(f"  Escalated:              {routing['escalated']}/"
+                      f"{agent.get('unique_sentences', agent['sentences'])} "
+                      f"({routing['escalation_rate']:.0%}, threshold {routing['threshold']})")
+                if routing["latency_gain"]:
+                    print(f"  Latency gain:           {routing['latency_gain']:.2f}x "
+                          f"({routing['throughput_sentences_per_s']:.2f} sentences/s)")
+            hedging = agent.get("hedging")
+            if hedging:
+                print(f"  Hedges fired/won:       {hedging['fired']}/{hedging['won']} "
+                      f"(budget {hedging['budget']})")
+        print(f"Pipeline output tokens/sentence: {performance['output_tokens_per_sentence']:.1f}")
+        print(f"Pipeline latency/sentence:       {performance['latency_per_sentence_s']:.2f}s")
         print("="*60)
 
 
 def print_translation_journey(
-    hebrew_original: List[str],
-    english: List[str],
-    french: List[str],
-    hebrew_final: List[str],
+    stages: List[Tuple[str, List[str]]],
     distances: List[float] = None,
     max_display: int = 5
 ) -> None:
@@ -254,10 +481,7 @@ def print_translation_journey(
     Print translation journey for sentences.
 
     Args:
-        hebrew_original: Original Hebrew sentences
-        english: English translations
-        french: French translations
-        hebrew_final: Final Hebrew translations
+        stages: (label, sentences) for each stage, e.g. ("Original (HE)", [...])
         distances: Optional cosine distances
         max_display: Maximum number of sentences to display
     """
@@ -265,38 +489,44 @@ def print_translation_journey(
     print("TRANSLATION JOURNEY RESULTS")
     print("="*60 + "\n")
 
-    num_to_display = min(max_display, len(hebrew_original))
+    num_sentences = len(stages[0][1])
+    num_to_display = min(max_display, num_sentences)
 
     for i in range(num_to_display):
         print(f"Sentence {i+1}:")
-        print(f"  Original (HE):  {hebrew_original[i]}")
-        print(f"  English (EN):   {english[i]}")
-        print(f"  French (FR):    {french[i]}")
-        print(f"  Final (HE):     {hebrew_final[i]}")
+        for label, sentences in stages:
+            print(f"  {label + ':':<15} {sentences[i]}")
         if distances:
             print(f"  Distance:       {distances[i]:.4f}")
         print()
 
-    if len(hebrew_original) > max_display:
-        print(f"... and {len(hebrew_original) - max_display} more sentences\n")
+    if num_sentences > max_display:
+        print(f"... and {num_sentences - max_display} more sentences\n")
 
     print("="*60)
 
 
-def print_file_summary() -> None:
-    """Print summary of generated files."""
+def print_file_summary(files: List[Path] = None) -> None:
+    """
+    Print summary of generated files.
+
+    Args:
+        files: Files to report (default: the standard output files)
+    """
     print("\n" + "="*60)
     print("FILES GENERATED")
     print("="*60)
 
-    files = [
-        config.SENTENCES_HEBREW_ORIGINAL,
-        config.SENTENCES_ENGLISH,
-        config.SENTENCES_FRENCH,
-        config.SENTENCES_HEBREW_FINAL,
-        config.QUALITY_METRICS_FILE,
-        config.QUALITY_GRAPH_FILE
-    ]
+    if files is None:
+        files = [
+            config.SENTENCES_HEBREW_ORIGINAL,
+            config.SENTENCES_ENGLISH,
+            config.SENTENCES_FRENCH,
+            config.SENTENCES_HEBREW_FINAL,
+            config.QUALITY_METRICS_FILE,
+            config.QUALITY_GRAPH_FILE,
+            config.PERFORMANCE_METRICS_FILE
+        ]
 
     for filepath in files:
         if filepath.exists():
@@ -0,0 +1,464 @@
+"""
+Cross-run nearest-neighbor index over round-trip embeddings.
+
+Every analyzed run appends a block of L2-normalized original and final Hebrew
+embeddings, their round-trip distances and sentence metadata; re-analyzing a
+run directory's chain replaces its earlier block. Blocks are
+plain .npy files searched exactly with memory-mapped NumPy dot products, so
+queries over many runs take milliseconds once the query is embedded.
+
+Layout of the index directory:
+    manifest.json              dimension, embedding model, list of blocks
+    .lock                      serializes writers across processes
+    block_00001_original.npy   float32 [rows, dim]
+    block_00001_final.npy      float32 [rows, dim]
+    block_00001_distance.npy   float32 [rows]
+    block_00001_meta.json      run_id, sentence_id, chain, texts per row
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+
+import config
+from analysis import IncrementalAnalyzer, analysis_cache_file
+from pipeline import chain_key
+from utils import EmbeddingEngine
+
+FIELDS = ("original", "final")
+
+
+def normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so cosine similarity becomes a dot product."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def run_identifier(run_dir: Path, chain: Sequence[str]) -> str:
+    """
+    Identify one analysis of a run directory's round-trip chain.
+
+    The analysis cache is rewritten whenever the chain is (re-)scored, so its
+    modification time tells apart successive runs written to the same
+    directory, while indexing the same analysis twice is a no-op.
+
+    Args:
+        run_dir: Run directory
+        chain: Round-trip chain
+
+    Returns:
+        Identifier such as '/abs/output@2024-05-01T12:00:00#he-en-fr-he'
+    """
+    cache_file = analysis_cache_file(chain, run_dir)
+    stamp = datetime.fromtimestamp(cache_file.stat().st_mtime).isoformat(timespec='seconds')
+    return f"{Path(run_dir).resolve()}@{stamp}#{chain_key(chain)}"
+
+
+def run_key(run_dir: Path, chain: Sequence[str]) -> str:
+    """
+    Identify a run directory's round-trip chain across re-analyses.
+
+    Args:
+        run_dir: Run directory
+        chain: Round-trip chain
+
+    Returns:
+        Key such as '/abs/output#he-en-fr-he'; a newer block with the same
+        key replaces the older one
+    """
+    return f"{Path(run_dir).resolve()}#{chain_key(chain)}"
+
+
+def block_key(block: Dict) -> str:
+    """Run key of a manifest block (derived from run_id for older indexes)."""
+    if "key" in block:
+        return block["key"]
+    location, _, chain = block["run_id"].rpartition("#")
+    return f"{location.rpartition('@')[0] or location}#{chain}"
+
+
+class DriftIndex:
+    """Persistent index of original/final embeddings, one block per run and chain."""
+
+    # Serializes writers within a process (e.g. a sweep); the lock file in the
+    # index directory serializes them across processes
+    _write_lock = threading.Lock()
+
+    def __init__(self, index_dir: Path = config.INDEX_DIR):
+        """
+        Open (or create) an index directory.
+
+        Args:
+            index_dir: Directory holding the manifest and blocks
+        """
+        self.index_dir = Path(index_dir)
+        self.manifest_file = self.index_dir / "manifest.json"
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self) -> Dict:
+        """Read the manifest (an empty one for a new index)."""
+        if not self.manifest_file.exists():
+            return {"model": config.EMBEDDING_MODEL, "dim": None, "blocks": []}
+        with open(self.manifest_file, 'r', encoding=config.FILE_ENCODING) as f:
+            return json.load(f)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the index's write lock (threads and processes)."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with self._write_lock, open(self.index_dir / ".lock", 'a+b') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            else:
+                handle.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass  # LK_LOCK gives up after ~10 s; keep waiting
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _write_manifest(self) -> None:
+        """Replace the manifest atomically, so readers never see a partial file."""
+        temp_file = self.manifest_file.with_suffix(".json.tmp")
+        with open(temp_file, 'w', encoding=config.FILE_ENCODING) as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, self.manifest_file)
+
+    def blocks(self) -> List[Dict]:
+        """Live blocks: the newest block of each run key."""
+        latest = {block_key(block): block for block in self.manifest["blocks"]}
+        return [block for block in self.manifest["blocks"] if latest[block_key(block)] is block]
+
+    @property
+    def size(self) -> int:
+        """Number of indexed sentence pairs."""
+        return sum(block["rows"] for block in self.blocks())
+
+    def has_run(self, run_id: str) -> bool:
+        """Whether a run (and chain) was already indexed."""
+        return any(block["run_id"] == run_id for block in self.manifest["blocks"])
+
+    def add(
+        self,
+        run_id: str,
+        chain: Sequence[str],
+        originals: List[str],
+        finals: List[str],
+        original_embeddings: np.ndarray,
+        final_embeddings: np.ndarray,
+        distances: List[float],
+        key: Optional[str] = None
+    ) -> int:
+        """
+        Add a run's sentence pairs as a new block, replacing older blocks of
+        the same run key.
+
+        Args:
+            run_id: Unique identifier of the analysis (see run_identifier)
+            chain: Round-trip chain of the run
+            originals: Original sentences
+            finals: Final sentences
+            original_embeddings: Embeddings of the originals
+            final_embeddings: Embeddings of the finals
+            distances: Round-trip cosine distances
+            key: Run key (see run_key; default: run_id)
+
+        Returns:
+            Number of rows added (0 if the run was already indexed)
+        """
+        if not originals:
+            return 0
+        key = key or run_id
+        with self._locked():
+            # Pick up blocks written by other runs since this index was opened
+            self.manifest = self._read_manifest()
+            if self.has_run(run_id):
+                print(f"  Drift index already contains {run_id}; skipped")
+                return 0
+            superseded = [block for block in self.manifest["blocks"] if block_key(block) == key]
+            self._append_block(run_id, key, chain, originals, finals,
+                               original_embeddings, final_embeddings, distances)
+            self.manifest["blocks"] = [
+                block for block in self.manifest["blocks"] if block not in superseded
+            ]
+            self._write_manifest()
+            self._remove_block_files(superseded)
+
+        if superseded:
+            print(f"  Replaced {len(superseded)} older block(s) of {key}")
+
+        print(f"[✓] Indexed {len(originals)} sentence pairs from {run_id} "
+              f"(index size: {self.size})")
+        return len(originals)
+
+    def _append_block(
+        self,
+        run_id: str,
+        key: str,
+        chain: Sequence[str],
+        originals: List[str],
+        finals: List[str],
+        original_embeddings: np.ndarray,
+        final_embeddings: np.ndarray,
+        distances: List[float]
+    ) -> None:
+        """Write the block files, then register the block in the manifest (not yet saved)."""
+        original_embeddings = normalize_rows(original_embeddings)
+        final_embeddings = normalize_rows(final_embeddings)
+        dim = original_embeddings.shape[1]
+        if self.manifest["dim"] not in (None, dim):
+            raise ValueError(
+                f"Embedding dimension {dim} does not match the index ({self.manifest['dim']})"
+            )
+
+        # Numbers are never reused, so a replaced block's files can't be confused
+        number = self.manifest.get("next_block", len(self.manifest["blocks"]) + 1)
+        self.manifest["next_block"] = number + 1
+        name = f"block_{number:05d}"
+        np.save(self.index_dir / f"{name}_original.npy", original_embeddings)
+        np.save(self.index_dir / f"{name}_final.npy", final_embeddings)
+        np.save(self.index_dir / f"{name}_distance.npy", np.asarray(distances, dtype=np.float32))
+
+        meta = [
+            {
+                "run_id": run_id,
+                "sentence_id": i,
+                "chain": chain_key(chain),
+                "original": original,
+                "final": final
+            }
+            for i, (original, final) in enumerate(zip(originals, finals), 1)
+        ]
+        with open(self.index_dir / f"{name}_meta.json", 'w', encoding=config.FILE_ENCODING) as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        # The manifest is written last, so a crash never exposes a partial block
+        self.manifest["dim"] = dim
+        self.manifest["blocks"].append({
+            "name": name,
+            "run_id": run_id,
+            "key": key,
+            "rows": len(meta),
+            "added": datetime.now().isoformat()
+        })
+
+    def _remove_block_files(self, blocks: List[Dict]) -> None:
+        """Delete the files of blocks no longer in the manifest."""
+        for block in blocks:
+            for suffix in ("original.npy", "final.npy", "distance.npy", "meta.json"):
+                try:
+                    (self.index_dir / f"{block['name']}_{suffix}").unlink()
+                except OSError:
+                    pass  # Already gone, or still mapped by a reader (Windows)
+
+    def _load(self, block: Dict, suffix: str) -> np.ndarray:
+        """Memory-map one array of a block."""
+        return np.load(self.index_dir / f"{block['name']}_{suffix}.npy", mmap_mode='r')
+
+    def _rows(self, hits: List[tuple]) -> List[Dict]:
+        """Resolve (score, block, row) hits to metadata rows with distances."""
+        metas = {}
+        results = []
+        for score, block, row in hits:
+            if block["name"] not in metas:
+                with open(self.index_dir / f"{block['name']}_meta.json", 'r',
+                          encoding=config.FILE_ENCODING) as f:
+                    metas[block["name"]] = json.load(f)
+            results.append({
+                **metas[block["name"]][row],
+                "distance": float(self._load(block, "distance")[row]),
+                "score": float(score)
+            })
+        return results
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        k: int = 5,
+        field: str = "original"
+    ) -> List[Dict]:
+        """
+        Exact top-k cosine search over all blocks.
+
+        Args:
+            query_embedding: Embedding of the query sentence
+            k: Number of neighbors
+            field: Search 'original' or 'final' embeddings
+
+        Returns:
+            Neighbor rows sorted by similarity ('score'), with round-trip distance
+        """
+        if field not in FIELDS:
+            raise ValueError(f"field must be one of {FIELDS}")
+
+        query = normalize_rows(np.asarray(query_embedding).reshape(1, -1))[0]
+        candidates = []
+        for block in self.blocks():
+            if not block["rows"]:
+                continue
+            scores = self._load(block, field) @ query
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            candidates += [(scores[row], block, int(row)) for row in top]
+
+        candidates.sort(key=lambda hit: -hit[0])
+        return self._rows(candidates[:k])
+
+    def most_drifted(self, k: int = 10) -> List[Dict]:
+        """
+        Historical sentence pairs with the largest round-trip distance.
+
+        Args:
+            k: Number of pairs
+
+        Returns:
+            Rows sorted by descending distance ('score' is the distance)
+        """
+        candidates = []
+        for block in self.blocks():
+            if not block["rows"]:
+                continue
+            distances = self._load(block, "distance")
+            top = np.argpartition(-distances, min(k, len(distances)) - 1)[:k]
+            candidates += [(distances[row], block, int(row)) for row in top]
+
+        candidates.sort(key=lambda hit: -hit[0])
+        return self._rows(candidates[:k])
+
+
+def print_neighbors(rows: List[Dict], elapsed_ms: float, title: str) -> None:
+    """
+    Print query results.
+
+    Args:
+        rows: Rows from DriftIndex.search or most_drifted
+        elapsed_ms: Search time in milliseconds
+        title: Heading
+    """
+    print("\n" + "="*60)
+    print(f"{title} ({elapsed_ms:.1f} ms)")
+    print("="*60)
+    for rank, row in enumerate(rows, 1):
+        print(f"{rank}. score {row['score']:.4f} | distance {row['distance']:.4f} | "
+              f"{row['run_id']} #{row['sentence_id']} ({row['chain']})")
+        print(f"   Original: {row['original']}")
+        print(f"   Final:    {row['final']}")
+    print("="*60)
+
+
+def timed(func, *args, **kwargs):
+    """Run func and return (result, elapsed milliseconds)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def index_run_dir(
+    index: DriftIndex,
+    run_dir: Path,
+    chain: Sequence[str] = config.DEFAULT_CHAIN,
+    embedding_engine: Optional[EmbeddingEngine] = None,
+    source: str = "auto"
+) -> Optional[EmbeddingEngine]:
+    """
+    Add an existing run directory to the index.
+
+    Distances come from the incremental analyzer (re-scoring only pairs that
+    are not cached yet); embeddings are read from run.arrow when it stores
+    them, and computed for the pairs whose text differs from the artifact
+    (or for all pairs otherwise).
+
+    Args:
+        index: Index to append to
+        run_dir: Directory of a previous run
+        chain: Round-trip chain to index
+        embedding_engine: Already-loaded embedding engine (loaded lazily otherwise)
+        source: Where to load sentences from (see IncrementalAnalyzer.load)
+
+    Returns:
+        Embedding engine used (None if nothing had to be embedded)
+    """
+    run_dir = Path(run_dir)
+    analyzer = IncrementalAnalyzer(run_dir, chain, embedding_engine)
+    try:
+        stats = analyzer.analyze(source=source)
+    finally:
+        if analyzer.metric_engine is not None:
+            analyzer.metric_engine.close()
+    originals, finals = analyzer.load(source)
+
+    run_id = run_identifier(run_dir, chain)
+    if index.has_run(run_id):
+        print(f"  Drift index already contains {run_id}; skipped")
+        return analyzer.embedding_engine
+
+    original_embeddings = final_embeddings = None
+    stored_originals = stored_finals = None
+    artifact_file = run_dir / config.RUN_ARTIFACT_FILE.name
+    if artifact_file.exists():
+        from artifact import (
+            artifact_embeddings, artifact_stages, load_run_artifact, pyarrow_available
+        )
+
+        if pyarrow_available():
+            table = load_run_artifact(artifact_file)
+            original_embeddings = artifact_embeddings(table, chain[:1])
+            final_embeddings = artifact_embeddings(table, chain)
+            stages = artifact_stages(table)
+            stored_originals = stages.get(tuple(chain[:1]))
+            stored_finals = stages.get(tuple(chain))
+
+    engine = analyzer.embedding_engine
+    # Stored embeddings are stale where the text files were edited since the run
+    if original_embeddings is None or final_embeddings is None or \
+            stored_originals is None or stored_finals is None or \
+            len(stored_originals) != len(originals):
+        stale = list(range(len(originals)))
+        original_embeddings = final_embeddings = None
+    else:
+        stale = [
+            i for i in range(len(originals))
+            if stored_originals[i] != originals[i] or stored_finals[i] != finals[i]
+        ]
+
+    if stale:
+        if engine is None:
+            engine = EmbeddingEngine()
+        stale_originals = [originals[i] for i in stale]
+        stale_finals = [finals[i] for i in stale]
+        fresh_originals = engine.encode(stale_originals)
+        fresh_finals = engine.encode_round_trip(stale_finals, stale_originals, fresh_originals)
+        if original_embeddings is None:
+            original_embeddings, final_embeddings = fresh_originals, fresh_finals
+        else:
+            print(f"  {len(stale)} edited sentence pair(s) re-embedded")
+            original_embeddings = np.array(original_embeddings, copy=True)
+            final_embeddings = np.array(final_embeddings, copy=True)
+            original_embeddings[stale] = fresh_originals
+            final_embeddings[stale] = fresh_finals
+
+    index.add(run_id, chain, originals, finals,
+              original_embeddings, final_embeddings, stats["distances"],
+              key=run_key(run_dir, chain))
+    return engine
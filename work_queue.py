@@ -0,0 +1,582 @@
+"""
+Sharded multi-worker execution.
+
+A coordinator splits the corpus into shards stored in a SQLite work queue.
+Worker processes (local, or on other hosts sharing the filesystem) lease
+shards, run the translation agents and the embedding for them, and store
+results back in the queue. Leases expire, so shards held by crashed workers
+are handed out again. The coordinator merges results into the normal outputs.
+"""
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import config
+from analysis import analysis_cache_file, save_analysis_cache
+from artifact import write_run_artifact
+from pipeline import chain_key, parse_chain, quality_output_files, stage_output_file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sentences (
+    sentence_id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    shard_id INTEGER PRIMARY KEY,
+    start_id INTEGER NOT NULL,
+    end_id INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT
+);
+"""
+
+
+def worker_id() -> str:
+    """Identifier of this worker process, unique across hosts."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """Durable SQLite queue of sentence shards with expiring leases."""
+
+    def __init__(self, db_path: Path, lease_seconds: float = config.QUEUE_LEASE_SECONDS):
+        """
+        Open (and create if needed) a work queue.
+
+        Args:
+            db_path: Path to the SQLite file
+            lease_seconds: How long a claimed shard stays leased without renewal
+        """
+        self.db_path = Path(db_path)
+        self.lease_seconds = lease_seconds
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; each call/thread uses its own."""
+        conn = sqlite3.connect(self.db_path, timeout=config.QUEUE_BUSY_TIMEOUT, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def initialize(self, sentences: List[str], shard_size: int, job: Dict) -> int:
+        """
+        Load a corpus and its job configuration into an empty queue.
+
+        Args:
+            sentences: Full corpus
+            shard_size: Sentences per shard
+            job: Run configuration shared by all workers
+
+        Returns:
+            Number of shards created
+        """
+        if not sentences:
+            raise ValueError("Cannot queue an empty corpus")
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT COUNT(*) FROM shards").fetchone()[0]:
+                raise ValueError(f"Work queue {self.db_path} already holds a job; use --resume")
+
+            conn.executemany(
+                "INSERT INTO sentences (sentence_id, text) VALUES (?, ?)",
+                list(enumerate(sentences, 1))
+            )
+            bounds = [
+                (start, min(start + shard_size - 1, len(sentences)))
+                for start in range(1, len(sentences) + 1, shard_size)
+            ]
+            conn.executemany("INSERT INTO shards (start_id, end_id) VALUES (?, ?)", bounds)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('job', ?)",
+                (json.dumps(job, ensure_ascii=False),)
+            )
+            conn.execute("COMMIT")
+            return len(bounds)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def job(self) -> Dict:
+        """Job configuration stored by the coordinator."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'job'").fetchone()
+        if row is None:
+            raise RuntimeError(f"Work queue {self.db_path} has no job")
+        return json.loads(row["value"])
+
+    def claim(self, owner: str) -> Optional[Tuple[int, List[str]]]:
+        """
+        Lease the next pending or expired shard.
+
+        Expired leases that already used QUEUE_MAX_ATTEMPTS (e.g. a shard
+        that keeps crashing its workers) are marked failed instead.
+
+        Args:
+            owner: Worker identifier
+
+        Returns:
+            Tuple of (shard_id, sentences), or None if nothing is available
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            conn.execute(
+                """UPDATE shards SET status = 'failed', owner = NULL, lease_expires = NULL,
+                       error = 'Lease expired'
+                   WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?""",
+                (now, config.QUEUE_MAX_ATTEMPTS)
+            )
+            row = conn.execute(
+                """SELECT shard_id, start_id, end_id FROM shards
+                   WHERE status = 'pending'
+                      OR (status = 'leased' AND lease_expires < ? AND attempts < ?)
+                   ORDER BY shard_id LIMIT 1""",
+                (now, config.QUEUE_MAX_ATTEMPTS)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                """UPDATE shards SET status = 'leased', owner = ?, lease_expires = ?,
+                   attempts = attempts + 1 WHERE shard_id = ?""",
+                (owner, now + self.lease_seconds, row["shard_id"])
+            )
+            sentences = [
+                r["text"] for r in conn.execute(
+                    "SELECT text FROM sentences WHERE sentence_id BETWEEN ? AND ? ORDER BY sentence_id",
+                    (row["start_id"], row["end_id"])
+                )
+            ]
+            conn.execute("COMMIT")
+            return row["shard_id"], sentences
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def renew(self, shard_id: int, owner: str) -> bool:
+        """Extend a lease; False if the shard was reassigned."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                """UPDATE shards SET lease_expires = ?
+                   WHERE shard_id = ? AND owner = ? AND status = 'leased'""",
+                (time.time() + self.lease_seconds, shard_id, owner)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, shard_id: int, owner: str, result: Dict) -> bool:
+        """Store a shard result; False if the lease was lost to another worker."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                """UPDATE shards SET status = 'done', result = ?, lease_expires = NULL
+                   WHERE shard_id = ? AND owner = ? AND status = 'leased'""",
+                (json.dumps(result, ensure_ascii=False), shard_id, owner)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, shard_id: int, owner: str, error: str) -> None:
+        """Release a shard after an error; it fails permanently after QUEUE_MAX_ATTEMPTS."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                """UPDATE shards SET
+                       status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                       error = ?, owner = NULL, lease_expires = NULL
+                   WHERE shard_id = ? AND owner = ? AND status = 'leased'""",
+                (config.QUEUE_MAX_ATTEMPTS, error, shard_id, owner)
+            )
+
+    def retry_failed(self) -> int:
+        """Return permanently failed shards to the queue; returns how many."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE shards SET status = 'pending', attempts = 0 WHERE status = 'failed'"
+            )
+        return cursor.rowcount
+
+    def progress(self) -> Dict[str, int]:
+        """Shard counts by status."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM shards GROUP BY status")
+            counts = {row["status"]: row["n"] for row in rows}
+        counts["total"] = sum(counts.values())
+        return counts
+
+    def is_finished(self) -> bool:
+        """Whether every shard is done or has failed permanently."""
+        counts = self.progress()
+        return counts.get("done", 0) + counts.get("failed", 0) == counts["total"]
+
+    def sentences(self) -> List[str]:
+        """Full corpus in sentence order."""
+        with closing(self._connect()) as conn:
+            return [r["text"] for r in conn.execute("SELECT text FROM sentences ORDER BY sentence_id")]
+
+    def failures(self) -> List[Dict]:
+        """Permanently failed shards with their sentence range, attempts and last error."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """SELECT shard_id, start_id, end_id, attempts, error FROM shards
+                   WHERE status = 'failed' ORDER BY start_id"""
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def results(self) -> List[Dict]:
+        """Completed shard results in corpus order."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT result FROM shards WHERE status = 'done' ORDER BY start_id"
+            ).fetchall()
+        return [json.loads(row["result"]) for row in rows]
+
+
+class LeaseKeeper:
+    """Context manager renewing a shard lease in the background while it is processed."""
+
+    def __init__(self, queue: WorkQueue, shard_id: int, owner: str):
+        self.queue = queue
+        self.shard_id = shard_id
+        self.owner = owner
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._renew_loop, daemon=True)
+
+    def _renew_loop(self) -> None:
+        interval = self.queue.lease_seconds / 3
+        while not self._stop.wait(interval):
+            if not self.queue.renew(self.shard_id, self.owner):
+                print(f"  ⚠ Lease on shard {self.shard_id} lost; result will be discarded")
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def orchestrator_from_job(job: Dict, output_dir: Path, **kwargs):
+    """
+    Create an orchestrator with a queued job's translation configuration.
+
+    Args:
+        job: Job configuration stored in the queue
+        output_dir: Directory for output files
+        **kwargs: Output options of the orchestrator (e.g. export_text_files)
+
+    Returns:
+        OrchestratorAgent configured like the job's coordinator
+    """
+    from orchestrator import OrchestratorAgent
+
+    return OrchestratorAgent(
+        chains=[parse_chain(chain) for chain in job["chains"]],
+        model=job["model"],
+        temperature=job["temperature"],
+        lean_responses=job["lean_responses"],
+        routing=job["routing"],
+        hedging=job.get("hedging", False),
+        output_dir=output_dir,
+        **kwargs
+    )
+
+
+def job_conflicts(job: Dict, requested: Dict) -> List[str]:
+    """
+    Compare explicitly requested options with a queued job's configuration.
+
+    Args:
+        job: Job configuration stored in the queue
+        requested: Option name -> value given for this invocation (job keys;
+            'chains' as tuples)
+
+    Returns:
+        One message per option that differs from the job
+    """
+    conflicts = []
+    for key, value in requested.items():
+        stored = job.get(key)
+        if key == "chains":
+            stored = [parse_chain(chain) for chain in stored]
+            value = [tuple(chain) for chain in value]
+        if stored != value:
+            conflicts.append(f"{key}: queue has {stored!r}, requested {value!r}")
+    return conflicts
+
+
+def run_worker(queue_path: Path, exit_when_idle: bool = True) -> int:
+    """
+    Process shards from a work queue until it is finished.
+
+    Args:
+        queue_path: Path to the SQLite queue
+        exit_when_idle: Stop when the queue is finished (otherwise keep polling)
+
+    Returns:
+        Number of shards this worker completed
+    """
+    queue = WorkQueue(queue_path)
+    job = queue.job()
+    owner = worker_id()
+
+    orchestrator = orchestrator_from_job(job, Path(queue_path).parent)
+
+    completed = 0
+    print(f"Worker {owner} started on {queue_path}")
+    while True:
+        claimed = queue.claim(owner)
+        if claimed is None:
+            if exit_when_idle and queue.is_finished():
+                break
+            time.sleep(config.QUEUE_POLL_SECONDS)
+            continue
+
+        shard_id, sentences = claimed
+        print(f"\nWorker {owner}: shard {shard_id} ({len(sentences)} sentences)")
+        try:
+            with LeaseKeeper(queue, shard_id, owner):
+                result = orchestrator.translate_and_score(sentences, job["round_trip"])
+            if queue.complete(shard_id, owner, result):
+                completed += 1
+        except Exception as e:
+            print(f"  ⚠ Shard {shard_id} failed: {e}")
+            queue.fail(shard_id, owner, str(e))
+
+    print(f"Worker {owner} finished ({completed} shards)")
+    return completed
+
+
+class Coordinator:
+    """Creates the work queue, launches local workers and merges results."""
+
+    def __init__(
+        self,
+        queue_path: Path = config.QUEUE_FILE,
+        orchestrator=None
+    ):
+        """
+        Args:
+            queue_path: Path to the SQLite queue
+            orchestrator: OrchestratorAgent used for generation and output writing
+        """
+        self.queue_path = Path(queue_path)
+        self.orchestrator = orchestrator
+        self.queue = None
+
+    def submit(
+        self,
+        sentences: List[str],
+        shard_size: int = config.QUEUE_SHARD_SIZE,
+        round_trip: bool = True
+    ) -> None:
+        """
+        Create a queue for the corpus using the orchestrator's configuration.
+
+        Args:
+            sentences: Hebrew corpus
+            shard_size: Sentences per shard
+            round_trip: Whether workers compute round-trip distances
+        """
+        orchestrator = self.orchestrator
+        job = {
+            "chains": [chain_key(chain) for chain in orchestrator.dag.chains],
+            "model": orchestrator.model,
+            "temperature": orchestrator.temperature,
+            "lean_responses": orchestrator.lean_responses,
+            "routing": orchestrator.routing,
+            "hedging": orchestrator.hedging,
+            "round_trip": round_trip
+        }
+        self.queue = WorkQueue(self.queue_path)
+        num_shards = self.queue.initialize(sentences, shard_size, job)
+        print(f"[✓] Queued {len(sentences)} sentences in {num_shards} shards: {self.queue_path}")
+
+    def resume(self) -> None:
+        """Reopen an existing queue, retrying shards that failed permanently."""
+        self.queue = WorkQueue(self.queue_path)
+        retried = self.queue.retry_failed()
+        if retried:
+            print(f"Retrying {retried} failed shards")
+
+    def launch_workers(self, num_workers: int) -> List[subprocess.Popen]:
+        """
+        Start local worker processes, logging to output/workers/worker_N.log.
+
+        Args:
+            num_workers: Number of processes to start
+
+        Returns:
+            Worker process handles
+        """
+        log_dir = self.queue_path.parent / "workers"
+        log_dir.mkdir(parents=True, exist_ok=True)
+        main_script = Path(__file__).parent / "main.py"
+
+        processes = []
+        for n in range(1, num_workers + 1):
+            # The child gets its own copy of the descriptor; ours is closed at once
+            with open(log_dir / f"worker_{n}.log", 'w', encoding=config.FILE_ENCODING) as log_file:
+                processes.append(subprocess.Popen(
+                    [sys.executable, str(main_script), "worker", str(self.queue_path)],
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT
+                ))
+        print(f"Launched {num_workers} local workers (logs in {log_dir})")
+        return processes
+
+    def wait(self, processes: List[subprocess.Popen]) -> None:
+        """
+        Wait until every shard is done or failed.
+
+        Shards of crashed workers are reclaimed by live workers once their
+        lease expires; this fails only if all local workers have exited.
+
+        Args:
+            processes: Local worker processes (may be empty for external workers)
+        """
+        last = None
+        while not self.queue.is_finished():
+            counts = self.queue.progress()
+            summary = ", ".join(f"{k}: {v}" for k, v in sorted(counts.items()))
+            if summary != last:
+                print(f"  Shards - {summary}")
+                last = summary
+
+            if processes and all(p.poll() is not None for p in processes):
+                raise RuntimeError(
+                    "All local workers exited before the queue finished; "
+                    f"see logs in {self.queue_path.parent / 'workers'}"
+                )
+            time.sleep(config.QUEUE_POLL_SECONDS)
+
+        for process in processes:
+            process.wait()
+
+    def merge(self) -> dict:
+        """
+        Merge shard results and write the normal run outputs.
+
+        Returns:
+            Merged results (stages, confidences, distances keyed by stage path)
+        """
+        failures = self.queue.failures()
+        if failures:
+            details = "\n".join(
+                f"  shard {f['shard_id']} (sentences {f['start_id']}-{f['end_id']}, "
+                f"{f['attempts']} attempts): {f['error']}"
+                for f in failures
+            )
+            raise RuntimeError(
+                f"{len(failures)} shards failed permanently; "
+                f"rerun the coordinator with --resume to retry them\n{details}"
+            )
+        if not self.queue.progress().get("done"):
+            raise RuntimeError(f"Work queue {self.queue_path} has no completed shards")
+
+        stages, confidences, distances = {}, {}, {}
+        for result in self.queue.results():
+            for target, part in (
+                (stages, result["stages"]),
+                (confidences, result["confidences"]),
+                (distances, result["distances"])
+            ):
+                for key, values in part.items():
+                    target.setdefault(parse_chain(key), []).extend(values)
+
+        return {"stages": stages, "confidences": confidences, "distances": distances}
+
+    def write_outputs(self, merged: dict) -> List[Path]:
+        """
+        Write merged results as a normal run: text files, metrics, graphs,
+        drift index and artifact.
+
+        Args:
+            merged: Output of merge()
+
+        Returns:
+            Paths of the written files
+        """
+        orchestrator = self.orchestrator
+        stages = merged["stages"]
+        files = []
+
+        if orchestrator.export_text_files:
+            for path, sentences in stages.items():
+                filepath = stage_output_file(path, orchestrator.output_dir)
+                orchestrator.file_manager.save_sentences(sentences, filepath)
+                files.append(filepath)
+
+        metric_jobs = {
+            chain: orchestrator.get_metric_engine().submit(stages[chain[:1]], stages[chain])
+            for chain in merged["distances"]
+        }
+        branch_stats = {}
+        for chain, distances in merged["distances"].items():
+            if not distances:
+                print(f"  ⚠ No distances for {chain_key(chain)}; skipping its quality report")
+                continue
+            stats = orchestrator.stats_calculator.calculate_statistics(distances)
+            stats["chain"] = list(chain)
+            stats["metrics"] = metric_jobs[chain].result()
+            branch_stats[chain] = stats
+            orchestrator.save_quality_report(stats, chain)
+            orchestrator.stats_calculator.print_statistics(stats)
+            files += list(quality_output_files(chain, orchestrator.output_dir))
+            save_analysis_cache(
+                analysis_cache_file(chain, orchestrator.output_dir),
+                stages[chain[:1]],
+                stages[chain],
+                distances,
+                metric_jobs[chain].statistics()
+            )
+
+        if branch_stats and config.UPDATE_DRIFT_INDEX:
+            # Workers keep their embeddings, so embed the merged corpus once here
+            root = orchestrator.dag.root.path
+            engine = orchestrator.get_embedding_engine()
+            embeddings = {root: engine.encode(stages[root])}
+            for chain in branch_stats:
+                embeddings[chain] = engine.encode_round_trip(
+                    stages[chain], stages[root], embeddings[root]
+                )
+            orchestrator.update_drift_index(stages[root], stages, embeddings, branch_stats)
+
+        if orchestrator.write_artifact:
+            filepath = orchestrator.output_file(config.RUN_ARTIFACT_FILE)
+            write_run_artifact(
+                filepath,
+                stages,
+                confidences=merged["confidences"],
+                distances=merged["distances"],
+                metadata={
+                    "model": orchestrator.model,
+                    "temperature": orchestrator.temperature,
+                    "chains": [chain_key(chain) for chain in orchestrator.dag.chains],
+                    "shards": self.queue.progress()["total"]
+                }
+            )
+            files.append(filepath)
+
+        return files